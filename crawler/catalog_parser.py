@@ -4,7 +4,7 @@
 
 1. 使用 `Downloader` 下载目录 HTML，并保存一份本地副本到 `data/books/{book_id}_catalog.html`，
    便于后续 debug 与结构对比。
-2. 使用 BeautifulSoup 解析：
+2. 使用 lxml 解析（C 层完成分词与建树，避免 BeautifulSoup 的 Python 级遍历开销）：
    - 书籍基本信息：书名、作者、最后更新、最新章节；
    - 所有卷信息：通过 `div.volume.clearfix` 全局选择，兼容不同书籍的结构差异；
    - 章节列表：在每个卷下的 `ul.chapter-list.clearfix > li.col-4 > a` 中提取标题与 URL。
@@ -20,36 +20,266 @@
 book_structure 上工作，而无需关心 `javascript:cid(0)` 这种站点内部占位链接。
 """
 
+import hashlib
+import io
 import json
 import re
 import os
-from typing import Dict, Optional
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from typing import Dict, Optional, Tuple
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+try:
+    import orjson
+except ImportError:  # 可选依赖：未安装时使用标准库 json
+    orjson = None
+
+try:
+    from html5_parser import parse as html5_parse
+except (ImportError, RuntimeError):
+    # 可选依赖：未安装，或与 lxml 链接的 libxml2 版本不一致（导入时抛 RuntimeError）时，
+    # 使用 lxml 自带的 HTML 解析器
+    html5_parse = None
 
 from .downloader import Downloader
 from .special_chapter_resolver import resolve_all_special_chapters
 
+# 处理相对导入和绝对导入
+try:
+    from storage.structure_storage import HAS_MSGPACK, pack_structure
+except ImportError:
+    from ..storage.structure_storage import HAS_MSGPACK, pack_structure
+
+
+# 目录中未公开章节的占位链接（驻留字符串：与解析出的 href 比较时可先走指针相等）
+_JS_CID0 = sys.intern('javascript:cid(0)')
+
+# 目录解析使用的HTTP磁盘缓存（SQLite）路径，不提交到仓库
+HTTP_CACHE_NAME = 'data/http_cache'
+
+# 预编译的正则表达式：目录URL中的书籍ID、最后更新日期、最新章节名称
+_CATALOG_ID_RE = re.compile(r'/novel/(\d+)/catalog')
+_LAST_UPDATE_RE = re.compile(r'最后更新：(\d{4}-\d{2}-\d{2})')
+_LATEST_CHAPTER_RE = re.compile(r'最新章节：(.+)')
+# book-meta 中各 span 的文本前缀
+_META_MARKERS = ('作者：', '最后更新：', '最新章节：')
+
 
 class ParseError(Exception):
     """解析错误"""
     pass
 
 
+def _has_class(name: str) -> str:
+    """生成匹配 class 属性中某个完整类名的 XPath 条件（等价于 CSS 的 `.name`）"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _first(nodes: list):
+    """返回XPath结果中的第一个节点，没有则返回None"""
+    return nodes[0] if nodes else None
+
+
+# XPath string()：在 C 层拼接元素下的全部文本节点；不生成 smart string，避免反向引用元素树
+_STRING_XPATH = etree.XPath('string()', smart_strings=False)
+
+
+def _text(elem) -> str:
+    """提取元素的全部文本并去除首尾空白（对应 BeautifulSoup 的 get_text(strip=True)）"""
+    # 同时适用于 lxml.html 与 lxml.etree 的元素（iterparse 产生的是后者）
+    return _STRING_XPATH(elem).strip()
+
+
+# 站点统一使用 UTF-8；以 bytes 输入时显式指定，避免页面缺少 charset 声明时被误判
+_HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8')
+
+
+def _parse_html(data: bytes):
+    """将整页 HTML 解析为 lxml 元素树
+
+    安装了 html5-parser 时使用它（C 实现的 HTML5 解析，对畸形标签的容错更好），
+    否则使用 lxml 自带的 HTML 解析器。两者返回的根元素都可直接用于下面的 XPath。
+    """
+    if html5_parse is not None:
+        return html5_parse(data, transport_encoding='utf-8', treebuilder='lxml')
+    return lxml_html.fromstring(data, parser=_HTML_PARSER)
+
+# 预编译的 XPath 表达式（模块加载时编译一次，解析时直接对树求值）
+# 与 lxml.cssselect.CSSSelector 等价（CSSSelector 本身也是编译成 XPath 对象），
+# 但不需要额外依赖 cssselect。右侧注释为对应的 CSS 选择器。
+_H1_XPATH = etree.XPath(f'//div[{_has_class("book-meta")}]/h1')           # div.book-meta > h1
+_ANY_H1_XPATH = etree.XPath('//h1')                                          # h1
+_TITLE_XPATH = etree.XPath('//title')                                        # title
+_SPAN_XPATH = etree.XPath(f'//div[{_has_class("book-meta")}]/p/span')       # div.book-meta > p > span
+_LINK_XPATH = etree.XPath('.//a')                                            # a
+_VOL_XPATH = etree.XPath(f'//div[{_has_class("volume")} and {_has_class("clearfix")}]')  # div.volume.clearfix
+_VOLUME_NAME_XPATH = etree.XPath(f'.//h2[{_has_class("v-line")}]')           # h2.v-line
+_COVER_LINK_XPATH = etree.XPath(f'.//a[{_has_class("volume-cover")}]')       # a.volume-cover
+_COVER_IMG_XPATH = etree.XPath(f'.//a[{_has_class("volume-cover")}]/img')    # a.volume-cover > img
+# ul.chapter-list.clearfix > li.col-4 > a
+_CHAP_XPATH = etree.XPath(
+    f'.//ul[{_has_class("chapter-list")} and {_has_class("clearfix")}]'
+    f'/li[{_has_class("col-4")}]/a'
+)
+
+
+def _join_url(base_url: str, href: str) -> str:
+    """将页面中的链接转换为完整URL
+
+    站点路径（"/novel/..."）直接拼接基础URL，已是完整URL的原样返回，
+    其余情况（相对路径、协议相对链接等）交给 urljoin 处理。
+    """
+    if href.startswith('/') and not href.startswith('//'):
+        return base_url.rstrip('/') + href
+    if href.startswith(('http://', 'https://')):
+        return href
+    return urljoin(base_url, href)
+
+
+def _atomic_write(file_path: str, data) -> None:
+    """原子写入文件：先写入临时文件，再用 os.replace 替换目标文件
+
+    写入中途崩溃时只会留下 `.tmp` 文件，不会破坏已有的目标文件。
+
+    Args:
+        file_path: 目标文件路径
+        data: bytes 按原样写入；str 按 UTF-8 编码写入
+    """
+    tmp_path = file_path + '.tmp'
+    if isinstance(data, bytes):
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+    else:
+        with open(tmp_path, 'w', encoding='utf-8', errors='replace') as f:
+            f.write(data)
+    os.replace(tmp_path, file_path)
+
+
+def _number_chapters(volumes: list) -> None:
+    """按卷的先后顺序为所有章节统一分配全局序号（从1开始）"""
+    # 计数器由 itertools.count 在 C 层推进；zip 先取章节再取序号，卷结束时不会多消耗序号
+    counter = count(1)
+    for volume in volumes:
+        for chapter, index in zip(volume["chapters"], counter):
+            chapter["index"] = index
+
+
+def _parse_volume(volume_div, base_url: str) -> Optional[Dict]:
+    """解析单个 div.volume 节点
+
+    Returns:
+        卷字典（章节的 index 均为 None，由调用方统一编号）；
+        找不到卷名或没有章节时返回 None
+    """
+    volume = {}
+    
+    # 提取卷名
+    try:
+        h2 = _first(_VOLUME_NAME_XPATH(volume_div))
+        if h2 is not None:
+            volume["volume_name"] = _text(h2)
+        else:
+            print(f"警告: 无法找到卷名，跳过该卷")
+            return None
+    except Exception as e:
+        print(f"警告: 提取卷名失败: {e}")
+        return None
+    
+    # 提取卷封面URL
+    try:
+        cover_link = _first(_COVER_LINK_XPATH(volume_div))
+        if cover_link is not None and cover_link.get('href'):
+            href = cover_link.get('href')
+            volume["front_page"] = _join_url(base_url, href)
+        else:
+            volume["front_page"] = None
+    except Exception as e:
+        print(f"警告: 提取卷封面URL失败: {e}")
+        volume["front_page"] = None
+    
+    # 提取卷封面图片URL（可选）
+    try:
+        img = _first(_COVER_IMG_XPATH(volume_div))
+        if img is not None:
+            # 优先使用data-original（懒加载）
+            cover_image = img.get('data-original') or img.get('src')
+            if cover_image:
+                volume["cover_image"] = cover_image
+    except Exception as e:
+        print(f"警告: 提取卷封面图片失败: {e}")
+    
+    # 提取章节列表
+    # 热循环：常用对象先放进局部变量，循环内只收集元组，最后统一构造字典
+    chapters = []
+    try:
+        chapter_links = _CHAP_XPATH(volume_div)
+        base = base_url.rstrip('/')
+        placeholder = _JS_CID0
+        text = _text
+        rows = []
+        append = rows.append
+        
+        for link in chapter_links:
+            href = link.get('href') or ''
+            title = text(link)
+            
+            if href is placeholder or href == placeholder:
+                # 异常链接：保持原样，标记需特殊解析
+                append((title, href, True))
+            elif href.startswith('/') and not href.startswith('//'):
+                # 站内路径：直接拼接
+                append((title, base + href, False))
+            else:
+                # 其他链接：转换为完整URL
+                try:
+                    append((title, _join_url(base_url, href), False))
+                except Exception as e:
+                    print(f"警告: URL转换失败 ({href}): {e}，跳过该章节")
+                    continue
+        
+        chapters = [
+            {"index": None, "title": t, "url": u, "needs_resolve": n}
+            for t, u, n in rows
+        ]
+    except Exception as e:
+        print(f"警告: 提取章节列表失败: {e}")
+    
+    if not chapters:  # 只保留有章节的卷
+        return None
+    volume["chapters"] = chapters
+    return volume
+
+
 class CatalogParser:
     """目录页解析器"""
     
     BASE_URL = "https://www.linovelib.com"
     
-    def __init__(self, base_url: str = BASE_URL):
+    def __init__(self, base_url: str = BASE_URL,
+                 streaming: bool = False, debug: bool = False):
         """
         初始化解析器
         
         Args:
             base_url: 网站基础URL
+            streaming: 是否使用 iterparse 流式解析（峰值内存为单个卷而非整页）；
+                默认构建整棵文档树解析
+            debug: 是否额外保存 JSON 格式的书籍结构（便于人工查看）
         """
         self.base_url = base_url
-        self.downloader = Downloader(base_url=base_url)
+        self.streaming = streaming
+        self.debug = debug
+        # 输出目录只在初始化时创建一次
+        self._books_dir = 'data/books'
+        os.makedirs(self._books_dir, exist_ok=True)
+        # 目录页与特殊章节解析时访问的章节页启用HTTP磁盘缓存，重复解析同一本书时直接命中；
+        # 正文页由 chapter_parser 的渲染缓存负责，不在这里重复缓存
+        self.downloader = Downloader(base_url=base_url, cache_name=HTTP_CACHE_NAME)
+        # HTML副本与结构文件的写入只是副作用，放到后台线程执行；close() 时等待写完
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalog-io')
     
     def parse_catalog(self, book_id: Optional[str] = None, 
                      catalog_url: Optional[str] = None) -> Dict:
@@ -74,7 +304,7 @@ class CatalogParser:
         
         if catalog_url:
             # 从URL中提取book_id
-            match = re.search(r'/novel/(\d+)/catalog', catalog_url)
+            match = _CATALOG_ID_RE.search(catalog_url)
             if match:
                 book_id = match.group(1)
             else:
@@ -84,32 +314,40 @@ class CatalogParser:
         
         # 2. 下载HTML
         try:
-            html_content = self.downloader.download(catalog_url)
+            # 保持为 bytes，交给 lxml 按页面声明的编码解码
+            html_content = self.downloader.download_bytes(catalog_url)
             # 检查内容是否有效
             if not html_content or len(html_content) < 100:
                 raise ParseError(f"下载的内容过短或为空，可能是错误页面")
+            # 只检查开头一小段，无需对整页做 lower() 拷贝与多次全文扫描
+            head = html_content[:2048]
             # 检查是否是HTML格式
-            if not html_content.strip().startswith('<!'):
+            if not head.lstrip().startswith(b'<!'):
                 # 可能是错误页面或重定向，尝试检查
-                if 'error' in html_content.lower() or '403' in html_content or '404' in html_content:
-                    raise ParseError(f"可能遇到错误页面，内容前100字符: {html_content[:100]}")
+                if b'error' in head.lower() or b'403' in head or b'404' in head:
+                    preview = head[:100].decode('utf-8', errors='replace')
+                    raise ParseError(f"可能遇到错误页面，内容前100字符: {preview}")
         except Exception as e:
             raise ParseError(f"下载目录页失败: {e}")
         
         # 2.1 保存HTML副本用于debug
         self._save_html_copy(book_id, html_content)
         
-        # 3. 解析HTML
-        try:
-            soup = BeautifulSoup(html_content, 'lxml')
-        except Exception as e:
-            raise ParseError(f"HTML解析失败: {e}")
-        
-        # 4. 提取书籍基本信息
-        book_info = self._extract_book_info(soup, book_id)
-        
-        # 5. 提取卷和章节信息
-        volumes = self._extract_volumes(soup)
+        if self.streaming:
+            # 3-5. 流式解析：边解析边提取，处理完的卷立即释放
+            book_info, volumes = self._parse_streaming(html_content, book_id)
+        else:
+            # 3. 解析HTML
+            try:
+                root = _parse_html(html_content)
+            except Exception as e:
+                raise ParseError(f"HTML解析失败: {e}")
+            
+            # 4. 提取书籍基本信息
+            book_info = self._extract_book_info(root, book_id)
+            
+            # 5. 提取卷和章节信息
+            volumes = self._extract_volumes(root)
         
         # 6. 构建输出字典（先包含原始的 needs_resolve 标记）
         result = {
@@ -132,79 +370,84 @@ class CatalogParser:
             # 不让特殊解析器的错误中断整个目录解析流程
             print(f"警告: 解析特殊章节URL时出错: {e}")
         
-        # 7. 保存到文件
-        self._save_structure(book_id, result)
+        # 7. 保存到文件：等待写入完成后再返回，调用方随后即可用 load_structure 读取
+        for future in self._save_structure(book_id, result):
+            future.result()
         
         return result
     
-    def _extract_book_info(self, soup: BeautifulSoup, book_id: str) -> Dict:
+    def _extract_book_info(self, root: lxml_html.HtmlElement, book_id: str) -> Dict:
         """提取书籍基本信息"""
         book_info = {}
         
         # 提取书名
         try:
-            h1 = soup.select_one('div.book-meta > h1')
-            if h1:
-                book_info["name"] = h1.get_text(strip=True)
+            h1 = _first(_H1_XPATH(root))
+            if h1 is not None:
+                book_info["name"] = _text(h1)
             else:
                 # 尝试其他可能的选择器
-                h1 = soup.select_one('h1')
-                if h1:
-                    book_info["name"] = h1.get_text(strip=True)
+                h1 = _first(_ANY_H1_XPATH(root))
+                if h1 is not None:
+                    book_info["name"] = _text(h1)
                 else:
                     # 调试：打印页面标题
-                    title_tag = soup.find('title')
-                    title_text = title_tag.get_text(strip=True) if title_tag else "无标题"
+                    title_tag = _first(_TITLE_XPATH(root))
+                    title_text = _text(title_tag) if title_tag is not None else "无标题"
                     raise ParseError(f"无法找到书名。页面标题: {title_text}。请检查HTML结构或网站是否返回了错误页面。")
         except ParseError:
             raise
         except Exception as e:
             raise ParseError(f"提取书名失败: {e}")
         
+        # 作者 / 最后更新时间 / 最新章节都在同一组 span 中：
+        # 只查询一次，按文本前缀建立 {marker: (span, text)} 索引，之后各字段 O(1) 查找
+        by_marker = {}
+        try:
+            for span in _SPAN_XPATH(root):
+                text = _STRING_XPATH(span)
+                for marker in _META_MARKERS:
+                    if marker in text:
+                        by_marker.setdefault(marker, (span, text))
+                        break
+        except Exception as e:
+            print(f"警告: 提取书籍元信息失败: {e}")
+        
         # 提取作者
         try:
-            spans = soup.select('div.book-meta > p > span')
-            for span in spans:
-                text = span.get_text()
-                if '作者：' in text:
-                    author_link = span.find('a')
-                    if author_link:
-                        book_info["author"] = author_link.get_text(strip=True)
-                    break
+            entry = by_marker.get('作者：')
+            if entry:
+                author_link = _first(_LINK_XPATH(entry[0]))
+                if author_link is not None:
+                    book_info["author"] = _text(author_link)
         except Exception as e:
             print(f"警告: 提取作者失败: {e}")
         
         # 提取最后更新时间
         try:
-            spans = soup.select('div.book-meta > p > span')
-            for span in spans:
-                text = span.get_text()
-                if '最后更新：' in text:
-                    # 提取日期部分
-                    match = re.search(r'最后更新：(\d{4}-\d{2}-\d{2})', text)
-                    if match:
-                        book_info["last_update"] = match.group(1)
-                    break
+            entry = by_marker.get('最后更新：')
+            if entry:
+                # 提取日期部分
+                match = _LAST_UPDATE_RE.search(entry[1])
+                if match:
+                    book_info["last_update"] = match.group(1)
         except Exception as e:
             print(f"警告: 提取最后更新时间失败: {e}")
         
         # 提取最新章节
         try:
-            spans = soup.select('div.book-meta > p > span')
-            for span in spans:
-                text = span.get_text()
-                if '最新章节：' in text:
-                    # 提取章节名称
-                    match = re.search(r'最新章节：(.+)', text)
-                    if match:
-                        book_info["latest_chapter"] = match.group(1).strip()
-                    break
+            entry = by_marker.get('最新章节：')
+            if entry:
+                # 提取章节名称
+                match = _LATEST_CHAPTER_RE.search(entry[1])
+                if match:
+                    book_info["latest_chapter"] = match.group(1).strip()
         except Exception as e:
             print(f"警告: 提取最新章节失败: {e}")
         
         return book_info
     
-    def _extract_volumes(self, soup: BeautifulSoup) -> list:
+    def _extract_volumes(self, root: lxml_html.HtmlElement) -> list:
         """提取卷和章节信息
 
         注意：不同书籍的HTML结构略有差异：
@@ -214,147 +457,168 @@ class CatalogParser:
 
         因此，这里统一直接选择页面中的所有 div.volume.clearfix，而不是限定在 #volume-list 下，
         再根据是否有章节列表进行过滤。
+
+        卷解析是持有 GIL 的纯 Python 工作，直接在已解析好的文档树上串行处理；
+        全局章节序号在汇总后按顺序统一编号。
         """
-        volumes = []
         # 原来是：'#volume-list > div.volume.clearfix'
         # 为兼容4519等结构，这里改为全局选择
-        volume_divs = soup.select('div.volume.clearfix')
+        volume_divs = _VOL_XPATH(root)
         
-        global_chapter_index = 1
+        base_url = self.base_url
+        volumes = [volume for volume in (_parse_volume(v, base_url) for v in volume_divs) if volume]
+        _number_chapters(volumes)
+        return volumes
+    
+    def _parse_streaming(self, html_content: bytes, book_id: str) -> Tuple[Dict, list]:
+        """使用 lxml iterparse 流式解析目录页
+
+        只在 div 结束事件上处理：book-meta 结束时提取书籍信息，每个 div.volume 结束时
+        提取该卷并立即清空其子树，内存占用从整棵文档树降为单个卷。
+
+        Returns:
+            (book_info, volumes)
+        """
+        data = html_content.encode('utf-8') if isinstance(html_content, str) else html_content
+        book_info = None
+        volumes = []
         
-        for volume_div in volume_divs:
-            volume = {}
-            
-            # 提取卷名
-            try:
-                h2 = volume_div.select_one('h2.v-line')
-                if h2:
-                    volume["volume_name"] = h2.get_text(strip=True)
-                else:
-                    print(f"警告: 无法找到卷名，跳过该卷")
-                    continue
-            except Exception as e:
-                print(f"警告: 提取卷名失败: {e}")
-                continue
-            
-            # 提取卷封面URL
-            try:
-                cover_link = volume_div.select_one('a.volume-cover')
-                if cover_link and cover_link.get('href'):
-                    href = cover_link.get('href')
-                    volume["front_page"] = urljoin(self.base_url, href)
-                else:
-                    volume["front_page"] = None
-            except Exception as e:
-                print(f"警告: 提取卷封面URL失败: {e}")
-                volume["front_page"] = None
-            
-            # 提取卷封面图片URL（可选）
-            try:
-                img = volume_div.select_one('a.volume-cover > img')
-                if img:
-                    # 优先使用data-original（懒加载）
-                    cover_image = img.get('data-original') or img.get('src')
-                    if cover_image:
-                        volume["cover_image"] = cover_image
-            except Exception as e:
-                print(f"警告: 提取卷封面图片失败: {e}")
-            
-            # 提取章节列表
-            chapters = []
-            try:
-                chapter_links = volume_div.select('ul.chapter-list.clearfix > li.col-4 > a')
-                
-                for link in chapter_links:
-                    href = link.get('href', '')
-                    title = link.get_text(strip=True)
-                    
-                    # 判断是否为异常链接
-                    needs_resolve = (href == 'javascript:cid(0)')
-                    
-                    if needs_resolve:
-                        # 异常链接：保持原样
-                        chapter_url = href
-                    else:
-                        # 正常链接：转换为完整URL
-                        try:
-                            chapter_url = urljoin(self.base_url, href)
-                        except Exception as e:
-                            print(f"警告: URL转换失败 ({href}): {e}，跳过该章节")
-                            continue
-                    
-                    chapters.append({
-                        "index": global_chapter_index,
-                        "title": title,
-                        "url": chapter_url,
-                        "needs_resolve": needs_resolve
-                    })
-                    global_chapter_index += 1
-            except Exception as e:
-                print(f"警告: 提取章节列表失败: {e}")
-            
-            if chapters:  # 只添加有章节的卷
-                volume["chapters"] = chapters
-                volumes.append(volume)
+        try:
+            context = etree.iterparse(
+                io.BytesIO(data), events=('end',), tag='div', html=True, encoding='utf-8'
+            )
+            for _event, elem in context:
+                classes = (elem.get('class') or '').split()
+                if book_info is None and 'book-meta' in classes:
+                    book_info = self._extract_book_info(elem, book_id)
+                elif 'volume' in classes and 'clearfix' in classes:
+                    volume = _parse_volume(elem, self.base_url)
+                    if volume:
+                        volumes.append(volume)
+                    # 释放已处理的卷及其之前的兄弟节点
+                    elem.clear()
+                    parent = elem.getparent()
+                    while parent is not None and elem.getprevious() is not None:
+                        del parent[0]
+            root = context.root
+        except ParseError:
+            raise
+        except Exception as e:
+            raise ParseError(f"HTML解析失败: {e}")
         
-        return volumes
+        if book_info is None:
+            # 页面中没有 div.book-meta：按整页回退查找书名（找不到时抛出 ParseError）
+            book_info = self._extract_book_info(root, book_id)
+        
+        _number_chapters(volumes)
+        return book_info, volumes
+    
+    def _save_html_copy(self, book_id: str, html_content: bytes):
+        """保存HTML副本用于debug（提交到后台线程，不阻塞解析）"""
+        self._io_pool.submit(self._save_html_copy_sync, book_id, html_content)
     
-    def _save_html_copy(self, book_id: str, html_content: str):
-        """保存HTML副本用于debug"""
-        os.makedirs('data/books', exist_ok=True)
-        html_file_path = f'data/books/{book_id}_catalog.html'
+    def _save_html_copy_sync(self, book_id: str, html_content: bytes):
+        """保存HTML副本
+
+        同时在旁边保存内容摘要（`.blake2b`），内容未变化时跳过写入。
+        """
+        html_file_path = os.path.join(self._books_dir, f'{book_id}_catalog.html')
+        digest_file_path = f'{html_file_path}.blake2b'
         
         try:
-            # 确保内容是字符串类型
-            if isinstance(html_content, bytes):
-                # 如果是bytes，尝试解码
-                try:
-                    html_content = html_content.decode('utf-8')
-                except UnicodeDecodeError:
-                    html_content = html_content.decode('utf-8', errors='replace')
-            
-            # 确保是字符串
-            if not isinstance(html_content, str):
+            # 下载器返回的原始字节直接写入，不做解码/再编码
+            if isinstance(html_content, str):
+                html_content = html_content.encode('utf-8', errors='replace')
+            if not isinstance(html_content, bytes):
                 raise ValueError(f"html_content类型错误: {type(html_content)}")
             
-            with open(html_file_path, 'w', encoding='utf-8', errors='replace') as f:
-                f.write(html_content)
-            print(f"HTML副本已保存到: {html_file_path} ({len(html_content)} 字符)")
+            digest = hashlib.blake2b(html_content).hexdigest()
+            if os.path.exists(html_file_path) and os.path.exists(digest_file_path):
+                with open(digest_file_path, 'r', encoding='utf-8') as f:
+                    if f.read().strip() == digest:
+                        print(f"HTML副本未变化，跳过写入: {html_file_path}")
+                        return
+            
+            _atomic_write(html_file_path, html_content)
+            _atomic_write(digest_file_path, digest)
+            print(f"HTML副本已保存到: {html_file_path} ({len(html_content)} 字节)")
         except Exception as e:
             print(f"警告: 保存HTML副本失败: {e}")
             import traceback
             traceback.print_exc()
     
-    def _save_structure(self, book_id: str, structure: Dict):
-        """保存书籍结构到文件"""
-        os.makedirs('data/books', exist_ok=True)
-        file_path = f'data/books/{book_id}_structure.json'
+    def _save_structure(self, book_id: str, structure: Dict) -> list:
+        """保存书籍结构到文件（在后台线程写入）
+
+        默认保存为 MessagePack 列式格式（`{book_id}_structure.msgpack`）；
+        debug 模式、未安装 msgpack 或 MessagePack 序列化失败时同时/改为保存 JSON
+        （`{book_id}_structure.json`）。
+
+        序列化在当前线程完成，得到的字节是调用时刻的快照，
+        之后调用方修改返回的字典不会影响写入的内容。
+
+        Returns:
+            写入任务的 Future 列表，需要读取结构文件前应等待它们完成
+        """
+        futures = []
+        packed = False
+        if HAS_MSGPACK:
+            try:
+                data = pack_structure(structure)
+            except Exception as e:
+                print(f"警告: MessagePack序列化书籍结构失败: {e}，改为保存JSON")
+            else:
+                file_path = os.path.join(self._books_dir, f'{book_id}_structure.msgpack')
+                futures.append(self._io_pool.submit(self._write_structure_sync, file_path, data))
+                packed = True
         
+        if self.debug or not packed:
+            try:
+                # 无法序列化的值（如 MessagePack 失败的原因）按字符串保存
+                if orjson is not None:
+                    # orjson 在 C 层直接序列化为 UTF-8（仅支持2空格缩进）
+                    data = orjson.dumps(structure, default=str,
+                                        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+                else:
+                    data = json.dumps(structure, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+            except Exception as e:
+                print(f"警告: 序列化书籍结构失败: {e}")
+                return futures
+            file_path = os.path.join(self._books_dir, f'{book_id}_structure.json')
+            futures.append(self._io_pool.submit(self._write_structure_sync, file_path, data))
+        return futures
+    
+    def _write_structure_sync(self, file_path: str, data: bytes):
+        """将序列化后的书籍结构写入文件"""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(structure, f, ensure_ascii=False, indent=4)
+            _atomic_write(file_path, data)
             print(f"书籍结构已保存到: {file_path}")
         except Exception as e:
             print(f"警告: 保存文件失败: {e}")
     
     def close(self):
-        """关闭下载器"""
+        """等待后台写入完成并关闭下载器"""
+        self._io_pool.shutdown(wait=True)
         self.downloader.close()
 
 
 def parse_catalog(book_id: Optional[str] = None, 
-                  catalog_url: Optional[str] = None) -> Dict:
+                  catalog_url: Optional[str] = None,
+                  streaming: bool = False,
+                  debug: bool = False) -> Dict:
     """
     解析目录页的便捷函数
     
     Args:
         book_id: 书籍ID
         catalog_url: 目录页URL
+        streaming: 是否使用流式解析
+        debug: 是否额外保存 JSON 格式的书籍结构
     
     Returns:
         书籍结构字典
     """
-    parser = CatalogParser()
+    parser = CatalogParser(streaming=streaming, debug=debug)
     try:
         return parser.parse_catalog(book_id=book_id, catalog_url=catalog_url)
     finally:
@@ -367,6 +631,8 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='解析目录页')
     parser.add_argument('--book-id', type=str, help='书籍ID')
     parser.add_argument('--url', type=str, help='目录页URL')
+    parser.add_argument('--streaming', action='store_true', help='使用流式解析（降低超长目录页的内存占用）')
+    parser.add_argument('--debug', action='store_true', help='额外保存JSON格式的书籍结构（便于查看）')
     
     args = parser.parse_args()
     
@@ -375,7 +641,8 @@ if __name__ == '__main__':
         parser.error("必须提供 --book-id 或 --url 之一")
     
     try:
-        result = parse_catalog(book_id=args.book_id, catalog_url=args.url)
+        result = parse_catalog(book_id=args.book_id, catalog_url=args.url,
+                               streaming=args.streaming, debug=args.debug)
         print(f"\n解析成功！")
         print(f"书名: {result['name']}")
         print(f"作者: {result.get('author', '未知')}")
@@ -7,6 +7,7 @@
     - 生成Markdown格式的纯文本内容（移除HTML标签）
 
 实现要点：
+    - 不含mark("mid")动态重排序的页面直接通过Downloader以HTTP获取，不启动浏览器渲染
     - 使用Selenium WebDriver加载页面，等待JavaScript执行完成
     - 等待页面重排序完成（检测mark("mid")标记后的段落是否已重新排列）
     - 检测章节是否有多页（通过var nextpage变量或尝试访问_2.html）
@@ -14,15 +15,23 @@
     - 保存章节标题和Markdown格式内容到ChapterStorage
 """
 
-import json
 import re
 import argparse
+import gzip
+import hashlib
+import os
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple, Union
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
+import requests
+from lxml import etree, html as lxml_html
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -32,11 +41,16 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 
+from .downloader import Downloader
+from .special_chapter_resolver import CHAPTER_ID_PATTERN, NEXT_PAGE_VAR_PATTERN
+
 # 处理相对导入和绝对导入
 try:
     from storage.chapter_storage import ChapterStorage
+    from storage.structure_storage import load_structure
 except ImportError:
     from ..storage.chapter_storage import ChapterStorage
+    from ..storage.structure_storage import load_structure
 
 
 class ParseError(Exception):
@@ -44,10 +58,212 @@ class ParseError(Exception):
     pass
 
 
-# 匹配 var nextpage="..." 的正则表达式
-NEXT_PAGE_VAR_PATTERN = re.compile(r'var\s+nextpage\s*=\s*"([^"]+)"')
-# 匹配章节ID的正则表达式
-CHAPTER_ID_PATTERN = re.compile(r"/novel/(\d+)/(\d+)(?:_\d+)?\.html")
+class PageNotFoundError(ParseError):
+    """页面不存在（HTTP 404），例如多页章节构造出的下一页并不存在"""
+    pass
+
+
+# 页面使用动态重排序的标记（含此标记的页面必须由浏览器执行JavaScript）
+DYNAMIC_PAGE_MARK = 'mark("mid")'
+# 重排序结束后，正文中至少出现这么多段落才认为动态内容已就绪
+MIN_PARAGRAPHS = 3
+# 需要过滤的广告/无效段落
+_AD_PATTERN = re.compile(r'^【.*】$|^手工砖块$|^广告', re.IGNORECASE)
+# 标题中可能出现的"正文"前缀
+_TITLE_PREFIX = re.compile(r'^正文\s*')
+
+# 页面以 UTF-8 字节交给 lxml 时使用；显式指定编码，精简文档和缓存页面没有 charset 声明时也不会被误判
+_HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8')
+# 正文中的段落与换行（只取 #TextContent 的直接子元素，文档顺序），以及找不到正文时回退使用的全部段落
+# id() 直接查 libxml2 的 ID 索引，不必像 //*[@id=...] 那样扫描整棵树
+_PBR_XPATH = etree.XPath("id('TextContent')/*[self::p or self::br]")
+_ALL_P_XPATH = etree.XPath("//p")
+# 章节标题：页面中的第一个 h1（#mlfy_main_text > h1 也包含在内）
+_TITLE_XPATH = etree.XPath("(//h1)[1]")
+# 页面内联脚本的文本（var nextpage 只出现在脚本中）
+_SCRIPT_TEXT_XPATH = etree.XPath("//script/text()", smart_strings=False)
+# XPath string()：在 C 层拼接元素下的全部文本节点
+_STRING_XPATH = etree.XPath('string()', smart_strings=False)
+
+
+def _text(elem) -> str:
+    """提取元素的全部文本并去除首尾空白（对应 BeautifulSoup 的 get_text(strip=True)）"""
+    # 正文段落几乎都没有子节点：直接读 .text，比调用 XPath 快数倍
+    if not len(elem):
+        return (elem.text or '').strip()
+    return _STRING_XPATH(elem).strip()
+
+
+# ChromeDriverManager().install() 每次都会联网检查最新版本：解析出的驱动路径缓存在本地，
+# 超过有效期或文件已不存在时才重新解析
+_DRIVER_PATH_CACHE = Path.home() / ".cache" / "mylinovel" / "chromedriver_path.txt"
+_DRIVER_PATH_MAX_AGE = 7 * 86400  # 秒
+
+
+def _driver_path() -> str:
+    """返回chromedriver可执行文件路径（优先使用本地缓存的路径）"""
+    try:
+        if time.time() - _DRIVER_PATH_CACHE.stat().st_mtime < _DRIVER_PATH_MAX_AGE:
+            cached = _DRIVER_PATH_CACHE.read_text(encoding='utf-8').strip()
+            if cached and os.path.exists(cached):
+                return cached
+    except OSError:
+        pass
+    
+    path = ChromeDriverManager().install()
+    try:
+        _DRIVER_PATH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        _DRIVER_PATH_CACHE.write_text(path, encoding='utf-8')
+    except OSError as e:
+        print(f"警告: 缓存chromedriver路径失败: {e}")
+    return path
+
+
+# Cloudflare 拦截页 / 人机验证页的特征（小写）。站点的正常页面也会引用
+# static.cloudflareinsights.com 与 /cdn-cgi/challenge-platform/scripts/jsd/ 脚本，
+# 因此不能只匹配 "cloudflare" 或 "challenge-platform"
+_BLOCK_MARKERS = (
+    'sorry, you have been blocked',       # 拦截页（Error 1020 等）
+    'cf-error-details',
+    '<title>attention required! | cloudflare',
+    '<title>just a moment',               # 人机验证页
+    'cf-challenge',
+    'cf_chl_opt',
+    'cf-browser-verification',
+)
+_BLOCK_MARKERS_BYTES = tuple(marker.encode('ascii') for marker in _BLOCK_MARKERS)
+
+
+def _is_blocked(page_html: Union[str, bytes]) -> bool:
+    """页面是否为Cloudflare拦截页或人机验证页（支持 str 和 UTF-8 bytes）"""
+    lowered = page_html.lower()
+    markers = _BLOCK_MARKERS_BYTES if isinstance(lowered, bytes) else _BLOCK_MARKERS
+    return any(marker in lowered for marker in markers)
+
+
+# 等待动态重排序完成的异步脚本（execute_async_script）
+# 参数：预期的第一段关键词列表、静默时间（毫秒）、最长等待时间（毫秒）
+# 在 #TextContent 上监听 DOM 变化：第一段已包含预期关键词时立即结束；
+# 观察到第一次变化（重排序已开始）后，每次变化重新计时，静默 quietMs 后结束；
+# 尚未观察到任何变化时不按静默判断（重排序脚本可能还没开始执行），最多等到 maxMs。
+# 返回 {text: 第一段文本, hit: 是否包含预期关键词, mutated: 是否观察到变化, waited: 等待秒数}，
+# 关键词匹配在页面内完成
+WAIT_FOR_REORDER_JS = """
+var keywords = arguments[0], quietMs = arguments[1], maxMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var start = Date.now();
+var finished = false, mutated = false, quietTimer = null, maxTimer = null, observer = null;
+
+function firstText() {
+    // 预期关键词都在段落开头附近：只取前200个字符，减少匹配和回传的数据量
+    var firstP = document.querySelector('#TextContent p');
+    return firstP ? firstP.textContent.trim().slice(0, 200) : '';
+}
+function hasKeyword(text) {
+    return keywords.some(function (k) { return text.indexOf(k) !== -1; });
+}
+function finish() {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(maxTimer);
+    var text = firstText();
+    done({text: text, hit: hasKeyword(text), mutated: mutated, waited: (Date.now() - start) / 1000});
+}
+function onChange() {
+    if (hasKeyword(firstText())) { finish(); return; }
+    if (!mutated) return;
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(finish, quietMs);
+}
+
+var container = document.getElementById('TextContent');
+if (!container) { finish(); return; }
+observer = new MutationObserver(function () { mutated = true; onChange(); });
+observer.observe(container, {childList: true, subtree: true, characterData: true});
+maxTimer = setTimeout(finish, maxMs);
+onChange();
+"""
+
+# 只取回解析需要的部分：标题 h1、正文 #TextContent 以及包含 var nextpage 的内联脚本，
+# 拼成一个精简文档返回，避免经 WebDriver 传输整页源码。找不到 #TextContent 时返回 null
+EXTRACT_PAGE_JS = """
+var tc = document.getElementById('TextContent');
+if (!tc) return null;
+var parts = [];
+var h1 = document.querySelector('h1');
+if (h1) parts.push(h1.outerHTML);
+parts.push(tc.outerHTML);
+var scripts = document.getElementsByTagName('script');
+for (var i = 0; i < scripts.length; i++) {
+    var text = scripts[i].textContent;
+    if (text && text.indexOf('nextpage') !== -1 && !tc.contains(scripts[i])) {
+        parts.push(scripts[i].outerHTML);
+    }
+}
+return '<html><body>' + parts.join('\\n') + '</body></html>';
+"""
+
+
+class _DriverPool:
+    """按需创建的WebDriver池，供 parse_chapter 的多个工作线程共用
+    
+    WebDriver 启动较慢（约2秒），而大多数页面由HTTP快速路径直接获取：
+    只有页面确实需要浏览器渲染时才借用，没有空闲的浏览器且未达到上限时才创建新的。
+    第一个是解析器的主WebDriver（由 ChapterParser.close 关闭），其余的由 close() 关闭。
+    """
+    
+    def __init__(self, parser: "ChapterParser", size: int):
+        self._parser = parser
+        self._size = size
+        self._created = 0
+        self._idle = queue.Queue()
+        self._extra = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def borrow(self):
+        """借用一个WebDriver，用完后归还（借用期间由当前线程独占）"""
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            driver = self._create()
+            if driver is None:
+                # 已达到上限：等待其他线程归还
+                driver = self._idle.get()
+        try:
+            yield driver
+        finally:
+            self._idle.put(driver)
+    
+    def _create(self):
+        """创建一个新的WebDriver；已达到上限时返回None"""
+        with self._lock:
+            if self._created >= self._size:
+                return None
+            if self._created == 0:
+                # 第一个浏览器创建失败时直接抛出，由调用方按章节下载失败处理
+                driver = self._parser._get_driver()
+            else:
+                try:
+                    driver = self._parser._init_driver()
+                except ParseError as e:
+                    print(f"警告: 创建额外的WebDriver失败，使用 {self._created} 个浏览器继续: {e}")
+                    self._size = self._created
+                    return None
+                self._extra.append(driver)
+            self._created += 1
+            return driver
+    
+    def close(self) -> None:
+        """关闭额外创建的WebDriver（主WebDriver由解析器关闭）"""
+        for driver in self._extra:
+            try:
+                driver.quit()
+            except:
+                pass
+        self._extra = []
 
 
 class ChapterParser:
@@ -55,21 +271,48 @@ class ChapterParser:
     
     BASE_URL = "https://www.linovelib.com"
     
-    def __init__(self, base_url: str = BASE_URL, headless: bool = True):
+    # 默认屏蔽的资源（广告、统计脚本、字体、样式表），只提取文本时不需要
+    DEFAULT_BLOCKED_URLS = (
+        '*googlesyndication*',
+        '*google-analytics*',
+        '*doubleclick*',
+        '*.woff*',
+        '*.ttf',
+        '*.css',
+    )
+    
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        headless: bool = True,
+        workers: int = 4,
+        blocked_urls: Optional[List[str]] = None,
+        http_fast_path: bool = True,
+    ):
         """
         初始化解析器
         
         Args:
             base_url: 网站基础URL
             headless: 是否使用无头模式（默认True）
+            workers: 并行下载章节的浏览器数量（每个工作线程独占一个WebDriver）
+            blocked_urls: 通过CDP屏蔽的URL模式列表（支持*通配符），None表示使用
+                          DEFAULT_BLOCKED_URLS，空列表表示不屏蔽
+            http_fast_path: 是否先通过HTTP获取页面，仅对含mark("mid")的动态页面使用浏览器渲染
         """
         self.base_url = base_url
         self.headless = headless
+        self.workers = max(1, workers)
+        self.blocked_urls = list(self.DEFAULT_BLOCKED_URLS if blocked_urls is None else blocked_urls)
+        # HTTP快速路径使用的下载器（多个工作线程共用，限速全局生效）
+        self.downloader = Downloader(base_url=base_url) if http_fast_path else None
+        # WebDriver 启动较慢（约2秒），在确实有页面需要浏览器渲染时才由 _get_driver 创建
         self.driver = None
-        self._init_driver()
+        # 渲染缓存目录（data/books/{book_id}/_render_cache），由 parse_chapter 设置；None 表示不使用
+        self._render_cache_dir: Optional[Path] = None
     
     def _init_driver(self):
-        """初始化WebDriver（配置反检测措施）"""
+        """创建并返回一个WebDriver（配置反检测措施）"""
         chrome_options = Options()
         if self.headless:
             chrome_options.add_argument('--headless=new')  # 使用新的headless模式
@@ -78,26 +321,34 @@ class ChapterParser:
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        # DOMContentLoaded 后即返回，不等待所有子资源加载完成（动态重排序由 _wait_for_page_load 等待）
+        chrome_options.page_load_strategy = 'eager'
         
         # 反检测措施
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         
-        # 禁用图片加载以提高速度
+        # 禁用图片、样式表、字体、插件等与正文无关的内容以提高速度
         prefs = {
             "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+            "profile.managed_default_content_settings.plugins": 2,
+            "profile.managed_default_content_settings.popups": 2,
+            "profile.managed_default_content_settings.geolocation": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
             "profile.default_content_setting_values.notifications": 2
         }
         chrome_options.add_experimental_option("prefs", prefs)
         
         try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.driver.set_page_load_timeout(60)
+            service = Service(_driver_path())
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+            driver.set_page_load_timeout(60)
             
             # 执行反检测脚本
-            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
                 'source': '''
                     Object.defineProperty(navigator, 'webdriver', {
                         get: () => undefined
@@ -105,33 +356,48 @@ class ChapterParser:
                 '''
             })
             
+            # 屏蔽广告、统计脚本和字体/样式表请求
+            if self.blocked_urls:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_urls})
+            
         except Exception as e:
             raise ParseError(f"初始化WebDriver失败: {e}")
+        return driver
+    
+    def _get_driver(self):
+        """返回主WebDriver（首次调用时创建）"""
+        if self.driver is None:
+            self.driver = self._init_driver()
+        return self.driver
     
     def close(self):
-        """关闭WebDriver"""
+        """关闭WebDriver和下载器"""
         if self.driver:
             try:
                 self.driver.quit()
             except:
                 pass
+        if self.downloader:
+            self.downloader.close()
     
-    def _wait_for_page_load(self, timeout: int = 30):
+    def _wait_for_page_load(self, driver, timeout: int = 30):
         """
         等待页面完全加载和重排序完成
         
         Args:
+            driver: 当前页面所在的WebDriver
             timeout: 超时时间（秒）
+            
+        Raises:
+            ParseError: 如果含mark("mid")的页面在最长等待时间内没有发生重排序
         """
         try:
-            # 等待页面基本加载完成
-            WebDriverWait(self.driver, timeout).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            
+            # 页面加载策略为 eager，driver.get 在 DOMContentLoaded 后即返回，
+            # 不再等待 readyState == "complete"（广告、统计等子资源与正文无关）
             # 等待#TextContent元素出现
             try:
-                WebDriverWait(self.driver, timeout).until(
+                WebDriverWait(driver, timeout).until(
                     EC.presence_of_element_located((By.ID, "TextContent"))
                 )
             except TimeoutException:
@@ -139,7 +405,7 @@ class ChapterParser:
             
             # 等待JavaScript执行完成（包括动态重排序）
             # 检查是否有mark("mid")标记
-            has_mark = self.driver.execute_script("""
+            has_mark = driver.execute_script("""
                 var scripts = document.querySelectorAll('script');
                 for (var i = 0; i < scripts.length; i++) {
                     if (scripts[i].textContent && scripts[i].textContent.includes('mark("mid")')) {
@@ -154,79 +420,55 @@ class ChapterParser:
                 # 等待更长时间，确保JavaScript完全执行和重排序完成
                 # 动态页面通常需要10-20秒来完成重排序
                 max_wait = 25  # 最多等待25秒
-                wait_interval = 0.5
-                waited = 0
+                quiet_ms = 1500  # 重排序开始后，段落持续这么久没有变化即视为重排序结束
                 
                 # 等待段落顺序稳定，检查第一个段落是否符合预期
                 # dynamic.html的第一个段落应该是"她懒散地躺在那里..."
                 expected_first_keywords = ["她懒散地躺在那里", "那个面具", "对于见惯了各色人等的洛特尔"]
-                last_first_paragraph = None
-                stable_count = 0
-                required_stable = 12  # 需要连续12次检查结果一致
-                found_expected = False
-                
-                # 先等待一段时间，让JavaScript开始执行
-                print("  等待JavaScript执行...")
-                time.sleep(3)
                 
                 # 尝试滚动页面，触发可能的懒加载或重排序
+                # （由此引起的DOM变化会被下面的 MutationObserver 观察到，无需固定等待）
                 try:
-                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(1)
-                    self.driver.execute_script("window.scrollTo(0, 0);")
-                    time.sleep(1)
+                    driver.execute_script(
+                        "window.scrollTo(0, document.body.scrollHeight); window.scrollTo(0, 0);"
+                    )
                 except:
                     pass
                 
-                while waited < max_wait:
-                    time.sleep(wait_interval)
-                    waited += wait_interval
-                    
-                    # 获取第一个段落的内容
-                    first_para = self.driver.execute_script("""
-                        var firstP = document.querySelector('#TextContent p');
-                        return firstP ? firstP.textContent.trim() : '';
-                    """)
-                    
-                    if first_para:
-                        # 检查是否包含预期的关键词（说明重排序已完成）
-                        for keyword in expected_first_keywords:
-                            if keyword in first_para:
-                                found_expected = True
-                                break
-                        
-                        if first_para == last_first_paragraph:
-                            stable_count += 1
-                            # 如果找到了预期的段落且稳定，可以提前结束
-                            if found_expected and stable_count >= required_stable:
-                                print(f"✓ 段落顺序已稳定且符合预期（等待了{waited:.1f}秒）")
-                                break
-                            # 如果稳定但不符合预期，继续等待
-                            elif stable_count >= required_stable * 2 and waited >= 15:
-                                print(f"⚠ 段落顺序已稳定但可能未完全重排序（等待了{waited:.1f}秒）")
-                                print(f"   当前第一个段落: {first_para[:60]}...")
-                                break
-                        else:
-                            stable_count = 0
-                            last_first_paragraph = first_para
-                            if found_expected:
-                                print(f"  检测到段落顺序变化（等待了{waited:.1f}秒）")
-                    else:
-                        # 如果还没有段落，继续等待
-                        stable_count = 0
+                # 在页面内注入 MutationObserver 等待重排序结束，只需一次 WebDriver 往返
+                driver.set_script_timeout(max_wait + 5)
+                result = driver.execute_async_script(
+                    WAIT_FOR_REORDER_JS, expected_first_keywords, quiet_ms, max_wait * 1000
+                ) or {}
+                first_para = result.get('text') or ''
+                waited = result.get('waited') or 0
+                found_expected = bool(result.get('hit'))
                 
                 if found_expected:
-                    print(f"✓ 检测到重排序后的段落顺序")
+                    print(f"✓ 检测到重排序后的段落顺序（等待了{waited:.1f}秒）")
+                elif result.get('mutated'):
+                    # 预期关键词只对应个别章节，其余章节以重排序后段落静默为准
+                    print(f"⚠ 未检测到预期的段落顺序，使用重排序结束后的顺序（等待了{waited:.1f}秒）")
+                    if first_para:
+                        print(f"   当前第一个段落: {first_para[:60]}...")
                 else:
-                    print(f"⚠ 未检测到预期的段落顺序（等待了{waited:.1f}秒）")
-                    if last_first_paragraph:
-                        print(f"   当前第一个段落: {last_first_paragraph[:60]}...")
+                    # 既没有命中关键词也没有发生重排序：此时段落仍是打乱的原始顺序，
+                    # 不能保存（也不会写入渲染缓存）
+                    raise ParseError(
+                        f"等待{waited:.1f}秒仍未观察到动态重排序，段落顺序可能错乱: {first_para[:60]}"
+                    )
                 
-                # 额外等待一小段时间，确保所有动态内容都已加载
-                time.sleep(2)
-            else:
-                # 没有mark标记，等待较短时间即可
-                time.sleep(2)
+                # 确认正文段落已经就绪（替代固定的额外等待）
+                try:
+                    WebDriverWait(driver, 5).until(
+                        lambda d: d.execute_script(
+                            "return document.querySelectorAll('#TextContent p').length"
+                        ) >= MIN_PARAGRAPHS
+                    )
+                except TimeoutException:
+                    # 段落本来就很少的页面（如章节最后一页）不影响后续提取
+                    pass
+            # 没有mark标记时，#TextContent 出现即可提取，无需额外等待
             
         except TimeoutException as e:
             print(f"警告: 等待页面加载超时: {e}")
@@ -237,6 +479,7 @@ class ChapterParser:
         chapter_index: Optional[int] = None,
         all_chapters: bool = False,
         force_redownload: bool = False,
+        use_render_cache: bool = True,
     ) -> None:
         """
         解析章节内容
@@ -246,18 +489,24 @@ class ChapterParser:
             chapter_index: 章节序号（从1开始），如果为None且all_chapters=False则不执行
             all_chapters: 如果为True，解析所有章节
             force_redownload: 如果为True，即使章节已存在也重新下载
+            use_render_cache: 如果为True，优先使用已缓存的渲染结果（跳过Selenium），
+                              新渲染的页面也会写入缓存；为False时总是重新渲染
         """
         # 加载书籍结构
-        structure_file = Path(f"data/books/{book_id}_structure.json")
-        if not structure_file.exists():
-            raise ParseError(f"找不到书籍结构文件: {structure_file}")
-        
-        with open(structure_file, 'r', encoding='utf-8') as f:
-            book_structure = json.load(f)
+        book_structure = load_structure(book_id)
+        if book_structure is None:
+            raise ParseError(f"找不到书籍结构文件: data/books/{book_id}_structure.msgpack(.json)")
         
         # 初始化存储管理器
         storage = ChapterStorage(book_id)
         
+        # 渲染缓存：--force 重新解析时无需重新渲染，中途崩溃后也不必重新访问已渲染的页面
+        if use_render_cache:
+            self._render_cache_dir = Path("data/books") / book_id / "_render_cache"
+            self._render_cache_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            self._render_cache_dir = None
+        
         # 收集所有章节
         all_chapter_list = []
         for volume in book_structure.get("volumes", []):
@@ -283,44 +532,67 @@ class ChapterParser:
         else:
             raise ValueError("必须指定 chapter_index 或设置 all_chapters=True")
         
-        # 处理每个章节
-        try:
-            for chapter in chapters_to_process:
-                idx = chapter.get("index")
-                title = chapter.get("title", "")
-                url = chapter.get("url", "")
-                
-                # 检查是否需要重新下载
-                if not force_redownload and storage.chapter_exists(idx):
-                    print(f"章节 {idx} 已存在，跳过: {title}")
-                    continue
-                
-                # 检查URL是否有效
-                if not url or url == "javascript:cid(0)":
-                    print(f"警告: 章节 {idx} 的URL无效: {url}，跳过")
-                    continue
+        # 先筛选出真正需要下载的章节，全部已存在时无需启动浏览器
+        todo = []
+        for chapter in chapters_to_process:
+            idx = chapter.get("index")
+            title = chapter.get("title", "")
+            url = chapter.get("url", "")
+            
+            # 检查是否需要重新下载
+            if not force_redownload and storage.chapter_exists(idx):
+                print(f"章节 {idx} 已存在，跳过: {title}")
+                continue
+            
+            # 检查URL是否有效
+            if not url or url == "javascript:cid(0)":
+                print(f"警告: 章节 {idx} 的URL无效: {url}，跳过")
+                continue
+            
+            todo.append(chapter)
+        
+        # 处理每个章节：多个工作线程并行下载，需要浏览器渲染的页面从池中借用WebDriver
+        worker_count = min(self.workers, len(todo))
+        drivers = _DriverPool(self, worker_count)
+        save_lock = threading.Lock()
+        
+        def process(chapter: Dict) -> None:
+            idx = chapter.get("index")
+            title = chapter.get("title", "")
+            url = chapter.get("url", "")
+            
+            try:
+                print(f"正在下载章节 {idx}: {title}")
+                content = self._download_chapter_content(drivers, url)
                 
-                try:
-                    print(f"正在下载章节 {idx}: {title}")
-                    content = self._download_chapter_content(url)
-                    
-                    # 保存章节
+                # 保存章节（串行写入）
+                with save_lock:
                     storage.save_chapter(idx, title, content)
-                    print(f"✓ 章节 {idx} 下载完成")
-                except Exception as e:
-                    print(f"✗ 章节 {idx} 下载失败: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
+                print(f"✓ 章节 {idx} 下载完成")
+            except Exception as e:
+                print(f"✗ 章节 {idx} 下载失败: {e}")
+                import traceback
+                traceback.print_exc()
+        
+        try:
+            if not todo:
+                print("没有需要下载的章节")
+                return
+            
+            with ThreadPoolExecutor(max_workers=worker_count) as pool:
+                # 消费迭代器以等待全部任务完成（异常已在 process 内处理）
+                list(pool.map(process, todo))
         finally:
-            # 确保关闭WebDriver
+            # 确保关闭所有WebDriver
+            drivers.close()
             self.close()
     
-    def _download_chapter_content(self, chapter_url: str) -> str:
+    def _download_chapter_content(self, drivers: _DriverPool, chapter_url: str) -> str:
         """
-        使用Selenium下载章节内容（支持多页）
+        下载章节内容（支持多页）：静态页面走HTTP快速路径，动态页面使用Selenium渲染
         
         Args:
+            drivers: WebDriver池，只有需要浏览器渲染的页面才从中借用
             chapter_url: 章节第一页URL
             
         Returns:
@@ -328,35 +600,19 @@ class ChapterParser:
         """
         # 访问第一页
         print(f"  访问页面: {chapter_url}")
-        try:
-            self.driver.get(chapter_url)
-            
-            # 检查是否被Cloudflare拦截
-            page_source = self.driver.page_source
-            if 'cloudflare' in page_source.lower() or 'sorry, you have been blocked' in page_source.lower():
-                print("⚠ 检测到Cloudflare拦截，等待验证...")
-                time.sleep(10)  # 等待可能的验证页面
-                page_source = self.driver.page_source
-                if 'cloudflare' in page_source.lower() or 'sorry, you have been blocked' in page_source.lower():
-                    raise ParseError("页面被Cloudflare拦截，无法访问")
-            
-        except WebDriverException as e:
-            raise ParseError(f"访问页面失败: {e}")
+        first_page_html = self._fetch_page(drivers, chapter_url, first_page=True)
         
-        # 等待页面完全加载
-        self._wait_for_page_load()
-        
-        # 获取页面源码
-        first_page_html = self.driver.page_source
+        # 只解析一次，标题和段落提取共用同一棵树
+        first_page_tree = self._parse_page(first_page_html)
         
         # 提取标题（通常在第一页）
-        title = self._extract_title(first_page_html)
+        title = self._extract_title(first_page_tree)
         
         # 提取第一页的正文段落（带空行信息）
-        all_paragraphs_with_spacing = self._extract_paragraphs_with_spacing(first_page_html)
+        all_paragraphs_with_spacing = self._extract_paragraphs_with_spacing(first_page_tree)
         
         # 查找是否有下一页
-        next_page_url = self._find_next_page_url(first_page_html, chapter_url)
+        next_page_url = self._find_next_page_url(first_page_html, chapter_url, first_page_tree)
         
         # 下载后续页面
         page_num = 2
@@ -364,15 +620,16 @@ class ChapterParser:
             try:
                 print(f"  下载第 {page_num} 页...")
                 # 访问下一页
-                self.driver.get(next_page_url)
-                self._wait_for_page_load()
-                
-                # 获取页面源码
-                page_html = self.driver.page_source
+                try:
+                    page_html = self._fetch_page(drivers, next_page_url)
+                except PageNotFoundError:
+                    print(f"  第 {page_num} 页不存在，停止下载")
+                    break
                 
                 # 提取段落（带空行信息）
                 try:
-                    paragraphs_with_spacing = self._extract_paragraphs_with_spacing(page_html)
+                    page_tree = self._parse_page(page_html)
+                    paragraphs_with_spacing = self._extract_paragraphs_with_spacing(page_tree)
                     if not paragraphs_with_spacing:
                         print(f"  页面无有效内容，停止下载")
                         break
@@ -382,7 +639,7 @@ class ChapterParser:
                     break
                 
                 # 查找下一页
-                next_page_url = self._find_next_page_url(page_html, next_page_url)
+                next_page_url = self._find_next_page_url(page_html, next_page_url, page_tree)
                 page_num += 1
                 
             except Exception as e:
@@ -390,121 +647,253 @@ class ChapterParser:
                 break
         
         # 组合成Markdown格式纯文本
-        # 每个段落一行，如果段落前有额外空行标记，则添加空行
-        lines = []
-        for i, (para, has_extra_blank) in enumerate(all_paragraphs_with_spacing):
-            # 如果不是第一个段落，检查是否需要添加空行
-            if i > 0:
-                prev_has_extra = all_paragraphs_with_spacing[i-1][1]
-                # 如果前一个段落后有额外空行标记，添加一个空行
-                if prev_has_extra:
-                    # 确保不会连续多个空行
-                    if not lines or lines[-1] != "":
-                        lines.append("")
-            lines.append(para)
-        
-        return "\n".join(lines)
+        return "\n".join(_iter_lines(all_paragraphs_with_spacing))
     
-    def _extract_paragraphs_with_spacing(self, html_content: str) -> List[Tuple[str, bool]]:
+    def _render_cache_path(self, url: str) -> Optional[Path]:
+        """渲染缓存文件路径（按URL的SHA1命名），未启用缓存时返回None"""
+        if self._render_cache_dir is None:
+            return None
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self._render_cache_dir / f"{digest}.html.gz"
+    
+    def _fetch_page(self, drivers: _DriverPool, url: str, first_page: bool = False) -> str:
         """
-        从HTML中提取段落，并检测段落之间是否有额外的空行（<br>标签）
+        获取渲染完成后的页面源码（优先读取渲染缓存，其次HTTP快速路径）
         
         Args:
-            html_content: HTML内容
+            drivers: WebDriver池，页面需要浏览器渲染时才从中借用
+            url: 页面URL
+            first_page: 是否为章节第一页（第一页需要检查Cloudflare拦截）
             
         Returns:
-            List of (paragraph_text, has_extra_blank_line) tuples
+            页面源码：来自渲染缓存和HTTP的是UTF-8字节，来自浏览器的是字符串
+            （两者都可直接交给 _parse_page，不做多余的解码/编码）
         """
-        soup = BeautifulSoup(html_content, 'lxml')
-        
-        # 查找 #TextContent
-        text_content = soup.select_one('#TextContent')
-        if not text_content:
-            # 如果找不到，尝试直接提取段落
-            paragraphs = []
-            for p in soup.find_all('p'):
-                text = p.get_text(strip=True)
-                if text and len(text) > 3:
-                    # 过滤广告
-                    if not re.search(r'^【.*】$|^手工砖块$|^广告', text, re.IGNORECASE):
-                        paragraphs.append((text, False))
-            return paragraphs
+        cache_path = self._render_cache_path(url)
+        if cache_path is not None and cache_path.exists():
+            try:
+                with gzip.open(cache_path, 'rb') as f:
+                    page_html = f.read()
+                print(f"  使用渲染缓存: {cache_path.name}")
+                return page_html
+            except (OSError, EOFError) as e:
+                print(f"警告: 读取渲染缓存失败，重新渲染: {e}")
+        
+        # 快速路径：静态页面（包括多页章节的后续页）直接使用HTTP响应，不经过浏览器渲染
+        page_html = self._fetch_page_http(url)
+        if page_html is not None:
+            self._write_render_cache(cache_path, page_html)
+            return page_html
+        
+        with drivers.borrow() as driver:
+            page_html = self._render_page(driver, url, first_page)
+        self._write_render_cache(cache_path, page_html)
+        return page_html
+    
+    def _render_page(self, driver, url: str, first_page: bool = False) -> str:
+        """
+        使用浏览器渲染页面，等待动态重排序完成后取回页面源码
+        
+        Args:
+            driver: 用于渲染页面的WebDriver（由当前线程独占）
+            url: 页面URL
+            first_page: 是否为章节第一页（第一页需要检查Cloudflare拦截）
+            
+        Returns:
+            页面源码
+        """
+        if first_page:
+            try:
+                driver.get(url)
+                
+                # 检查是否被Cloudflare拦截
+                page_source = driver.page_source
+                if _is_blocked(page_source):
+                    print("⚠ 检测到Cloudflare拦截，等待验证...")
+                    time.sleep(10)  # 等待可能的验证页面
+                    page_source = driver.page_source
+                    if _is_blocked(page_source):
+                        raise ParseError("页面被Cloudflare拦截，无法访问")
+                
+            except WebDriverException as e:
+                raise ParseError(f"访问页面失败: {e}")
+        else:
+            driver.get(url)
+        
+        # 等待页面完全加载
+        self._wait_for_page_load(driver)
+        
+        # 获取页面源码（只取回需要解析的部分）
+        return self._page_html(driver)
+    
+    def _fetch_page_http(self, url: str) -> Optional[bytes]:
+        """
+        通过HTTP获取页面（快速路径）
+        
+        Args:
+            url: 页面URL
+            
+        Returns:
+            页面HTML（UTF-8字节）；如果未启用快速路径、请求失败、被拦截或页面需要动态重排序，返回None
+            （调用方应改用浏览器渲染）
+            
+        Raises:
+            PageNotFoundError: 如果页面返回404
+        """
+        if self.downloader is None:
+            return None
+        try:
+            page_html = self.downloader.download_bytes(url)
+        except requests.HTTPError as e:
+            if getattr(e.response, 'status_code', None) == 404:
+                raise PageNotFoundError(f"页面不存在: {url}")
+            print(f"  HTTP获取失败，改用浏览器渲染: {e}")
+            return None
+        except Exception as e:
+            print(f"  HTTP获取失败，改用浏览器渲染: {e}")
+            return None
+        if _is_blocked(page_html):
+            print("  HTTP请求被Cloudflare拦截，改用浏览器渲染")
+            return None
+        if DYNAMIC_PAGE_MARK.encode('utf-8') in page_html:
+            # 动态重排序页面：段落顺序由JavaScript调整，必须由浏览器执行
+            return None
+        return page_html
+    
+    def _write_render_cache(self, cache_path: Optional[Path], page_html: Union[str, bytes]) -> None:
+        """写入渲染缓存（cache_path为None时不写入）"""
+        if cache_path is None:
+            return
+        # 先写临时文件再替换，避免中途崩溃留下不完整的缓存
+        tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+        try:
+            with gzip.open(tmp_path, 'wb', compresslevel=3) as f:
+                if isinstance(page_html, str):
+                    page_html = page_html.encode('utf-8')
+                f.write(page_html)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"警告: 写入渲染缓存失败: {e}")
+    
+    def _page_html(self, driver) -> str:
+        """
+        取回当前页面中需要解析的HTML（标题、正文和 nextpage 脚本）
+        
+        页面没有 #TextContent 时回退为完整的 page_source，以便回退的段落提取可以使用整页内容。
+        
+        Args:
+            driver: 当前页面所在的WebDriver
+            
+        Returns:
+            HTML内容
+        """
+        page_html = driver.execute_script(EXTRACT_PAGE_JS)
+        if not page_html:
+            page_html = driver.page_source
+        return page_html
+    
+    def _parse_page(self, html_content: Union[str, bytes]):
+        """
+        将页面源码解析为lxml元素树（供各个提取方法共用）
         
-        # 提取段落和空行信息
+        Args:
+            html_content: HTML内容；UTF-8字节直接交给 lxml 解析，无需先解码为字符串
+            
+        Returns:
+            lxml元素树的根元素
+        """
+        if isinstance(html_content, bytes):
+            return lxml_html.fromstring(html_content, parser=_HTML_PARSER)
+        return lxml_html.fromstring(html_content)
+    
+    def _extract_paragraphs_with_spacing(self, tree) -> List[Tuple[str, bool]]:
+        """
+        从页面中提取段落，并检测段落之间是否有额外的空行（<br>标签）
+        
+        Args:
+            tree: _parse_page 返回的lxml元素树
+            
+        Returns:
+            List of (paragraph_text, has_extra_blank_line) tuples
+        """
+        # 提取 #TextContent 中的段落和空行信息（单次遍历）：
+        # 保留的段落后紧跟一个或多个<br>、之后又出现段落时，标记该段落后有额外空行
+        # 热循环：每个元素的 tag 只读取一次，常用函数先放进局部变量
         paragraphs_with_spacing = []
-        elements = text_content.find_all(['p', 'br'])
+        append = paragraphs_with_spacing.append
+        text_of = _text
+        is_ad = _AD_PATTERN.search
+        last_kept = -1  # 上一个<p>被保留时，它在结果中的位置；否则为-1
+        seen_br = False  # last_kept 之后是否出现过<br>
+        
+        for elem in _PBR_XPATH(tree):
+            if elem.tag == 'br':
+                if last_kept >= 0:
+                    seen_br = True
+                continue
+            
+            # <p>：先结算上一个保留段落的空行标记
+            if seen_br:
+                paragraphs_with_spacing[last_kept] = (paragraphs_with_spacing[last_kept][0], True)
+            last_kept = -1
+            seen_br = False
+            
+            text = text_of(elem)
+            # 过滤过短的段落和广告
+            if len(text) > 3 and not is_ad(text):
+                last_kept = len(paragraphs_with_spacing)
+                append((text, False))
         
-        for i, elem in enumerate(elements):
-            if elem.name == 'p':
-                text = elem.get_text(strip=True)
-                if text and len(text) > 3:
-                    # 过滤广告
-                    if re.search(r'^【.*】$|^手工砖块$|^广告', text, re.IGNORECASE):
-                        continue
-                    
-                    # 检查下一个元素是否是<br>，如果是则标记有额外空行
-                    has_extra_blank = False
-                    if i + 1 < len(elements) and elements[i + 1].name == 'br':
-                        # 检查是否连续多个<br>，或者后面还有内容
-                        j = i + 1
-                        while j < len(elements) and elements[j].name == 'br':
-                            j += 1
-                        # 如果后面还有段落，说明有额外空行
-                        if j < len(elements) and elements[j].name == 'p':
-                            has_extra_blank = True
-                    
-                    paragraphs_with_spacing.append((text, has_extra_blank))
-        
-        # 如果提取失败，回退到简单提取
+        # 如果找不到 #TextContent 或提取失败，回退到直接提取全部段落
         if not paragraphs_with_spacing:
-            for p in soup.find_all('p'):
-                text = p.get_text(strip=True)
+            for p in _ALL_P_XPATH(tree):
+                text = _text(p)
                 if text and len(text) > 3:
-                    if not re.search(r'^【.*】$|^手工砖块$|^广告', text, re.IGNORECASE):
+                    if not _AD_PATTERN.search(text):
                         paragraphs_with_spacing.append((text, False))
         
         return paragraphs_with_spacing
     
-    def _extract_title(self, html_content: str) -> str:
+    def _extract_title(self, tree) -> str:
         """
-        从HTML中提取章节标题
+        从页面中提取章节标题
         
         Args:
-            html_content: HTML内容
+            tree: _parse_page 返回的lxml元素树
             
         Returns:
             章节标题
         """
-        soup = BeautifulSoup(html_content, 'lxml')
-        
-        # 尝试从 h1 标签提取
-        h1 = soup.select_one('h1')
-        if h1:
-            title = h1.get_text(strip=True)
-            # 移除可能的"正文"前缀
-            title = re.sub(r'^正文\s*', '', title)
-            return title
-        
-        # 尝试从 #mlfy_main_text > h1 提取
-        h1_alt = soup.select_one('#mlfy_main_text > h1')
-        if h1_alt:
-            return h1_alt.get_text(strip=True)
-        
-        return "未知标题"
+        nodes = _TITLE_XPATH(tree)
+        if not nodes:
+            return "未知标题"
+        # 移除可能的"正文"前缀
+        return _TITLE_PREFIX.sub('', _text(nodes[0]))
     
-    def _find_next_page_url(self, html_content: str, current_url: str) -> Optional[str]:
+    def _find_next_page_url(self, html_content: Union[str, bytes], current_url: str, tree=None) -> Optional[str]:
         """
         查找下一页URL
         
         Args:
             html_content: 当前页HTML内容
             current_url: 当前页URL
+            tree: 当前页的lxml元素树（可选）；提供时只在<script>文本中查找 var nextpage
             
         Returns:
             下一页URL，如果没有则返回None
         """
         # 方法1: 从 var nextpage 变量提取
-        match = NEXT_PAGE_VAR_PATTERN.search(html_content)
+        match = None
+        if tree is not None:
+            # 脚本文本通常只有几KB，比扫描整页源码快得多
+            for script in _SCRIPT_TEXT_XPATH(tree):
+                match = NEXT_PAGE_VAR_PATTERN.search(script)
+                if match:
+                    break
+        if match is None:
+            if isinstance(html_content, bytes):
+                html_content = html_content.decode('utf-8', errors='replace')
+            match = NEXT_PAGE_VAR_PATTERN.search(html_content)
         if match:
             next_path = match.group(1)
             # 检查是否是同一章的下一页
@@ -526,20 +915,9 @@ class ChapterParser:
         # 从当前URL提取基础部分
         match = CHAPTER_ID_PATTERN.search(current_url)
         if match:
-            article_id = match.group(1)
-            chapter_id = match.group(2)
-            # group(3) 可能不存在（第一页没有_2后缀）
-            page_suffix = match.group(3) if len(match.groups()) >= 3 else None
-            
-            # 确定当前页码
-            if page_suffix:
-                try:
-                    current_page = int(page_suffix[1:])  # 去掉下划线
-                    next_page = current_page + 1
-                except (ValueError, IndexError):
-                    next_page = 2
-            else:
-                next_page = 2
+            # 第一页没有分页页码；"_N" 页的下一页为 N+1
+            article_id, chapter_id, page = match.groups()
+            next_page = int(page) + 1 if page else 2
             
             # 构造下一页URL
             next_url = f"/novel/{article_id}/{chapter_id}_{next_page}.html"
@@ -550,8 +928,20 @@ class ChapterParser:
         return None
 
 
+def _iter_lines(paragraphs_with_spacing: List[Tuple[str, bool]]):
+    """逐行生成Markdown纯文本：每个段落一行，段落后有额外空行标记时在其后插入一个空行"""
+    prev_has_extra = False
+    for para, has_extra_blank in paragraphs_with_spacing:
+        # 段落文本非空，因此不会产生连续的空行
+        if prev_has_extra:
+            yield ""
+        yield para
+        prev_has_extra = has_extra_blank
+
+
+@lru_cache(maxsize=4096)
 def _extract_article_and_chapter(path_or_url: str) -> Optional[Tuple[str, str]]:
-    """从路径或URL中提取 (article_id, chapter_id_base)"""
+    """从路径或URL中提取 (article_id, chapter_id_base)（结果按URL缓存）"""
     m = CHAPTER_ID_PATTERN.search(path_or_url)
     if not m:
         return None
@@ -566,19 +956,27 @@ def main():
     parser.add_argument('--all-chapters', action='store_true', help='解析所有章节')
     parser.add_argument('--force', action='store_true', help='强制重新下载已存在的章节')
     parser.add_argument('--no-headless', action='store_true', help='不使用无头模式（显示浏览器窗口）')
+    parser.add_argument('--workers', type=int, default=4, help='并行下载章节的浏览器数量（默认4）')
+    parser.add_argument('--selenium-only', action='store_true', help='所有页面都用浏览器渲染（不走HTTP快速路径）')
+    parser.add_argument('--no-render-cache', action='store_true', help='不使用渲染缓存（总是重新用浏览器渲染页面）')
     
     args = parser.parse_args()
     
     if not args.chapter_index and not args.all_chapters:
         parser.error("必须指定 --chapter-index 或 --all-chapters")
     
-    parser_obj = ChapterParser(headless=not args.no_headless)
+    parser_obj = ChapterParser(
+        headless=not args.no_headless,
+        workers=args.workers,
+        http_fast_path=not args.selenium_only,
+    )
     try:
         parser_obj.parse_chapter(
             book_id=args.book_id,
             chapter_index=args.chapter_index,
             all_chapters=args.all_chapters,
             force_redownload=args.force,
+            use_render_cache=not args.no_render_cache,
         )
     except Exception as e:
         print(f"错误: {e}")
@@ -5,23 +5,37 @@
 - 统一封装所有 HTTP 访问逻辑，避免在各处直接使用 requests。
 - 处理：
   - 重试与指数退避；
-  - 内容编码与 gzip/deflate/Brotli 解压；
+  - 内容编码与解压（gzip/deflate，安装 brotli 后由 urllib3 自动支持 Brotli）；
   - 全局限速（避免触发 429 / 反爬）；
+  - 批量并发下载（线程池，多个请求同时在途，仍受全局限速约束）；
+  - 可选的 HTTP 响应磁盘缓存（requests-cache，需显式指定 cache_name 开启），
+    重复运行时直接命中本地缓存，命中的请求不经过限速；
   - 随机 User-Agent 等“伪装”逻辑。
 
 本模块是整个爬虫的“节流阀”和“防 ban 中枢”，上层（目录解析器 / 特殊章节解析器 /
 章节正文解析器）都只通过 Downloader 来发起请求，而不再自行 sleep 或设置 UA。
 """
 
+import os
 import random
+import threading
 import time
-from typing import Optional
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Union
 from urllib.parse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+try:
+    import requests_cache
+except ImportError:  # 可选依赖：未安装时退化为普通 Session，不做磁盘缓存
+    requests_cache = None
 
 # 一组常见的浏览器 User-Agent，用于随机轮换，降低被针对的概率
-USER_AGENTS = [
+USER_AGENTS = (
     # Chrome Windows
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
     "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
@@ -36,7 +50,75 @@ USER_AGENTS = [
     # Safari macOS
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
     "(KHTML, like Gecko) Version/17.3 Safari/605.1.15",
-]
+)
+_UA_COUNT = len(USER_AGENTS)
+
+# 流式下载时每次交给解析器的字节数
+STREAM_CHUNK_SIZE = 16384
+
+# 重试也不会改变结果的状态码，首次响应即抛出；
+# 其余 4xx（如 Cloudflare 临时验证返回的 403）仍按普通错误退避重试
+PERMANENT_ERROR_STATUS = frozenset({404, 410})
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器
+
+    桶中最多存放 capacity 个令牌，每秒补充 rate 个；每个请求消耗一个令牌。
+    空闲一段时间后允许最多 capacity 个请求连续发出（突发），长期来看请求频率
+    仍不超过 rate。令牌不足时在锁内预约（令牌数可以为负），再在锁外 sleep，
+    多个线程等待时不会互相阻塞在锁上。
+
+    补充速度按 AIMD 自适应：被限流（429）时减半，之后每连续成功
+    RECOVER_EVERY 次提高 10%，直到回到初始速度。
+    """
+
+    # 连续成功多少次后尝试提高一次补充速度
+    RECOVER_EVERY = 50
+
+    def __init__(self, capacity: float, rate: float, min_rate: Optional[float] = None):
+        """
+        Args:
+            capacity: 桶容量，即允许的最大突发请求数
+            rate: 每秒补充的令牌数，即长期平均请求频率上限（次/秒），同时也是自适应恢复的上限
+            min_rate: 被限流时补充速度下降的下限，None 表示 rate 的 1/10
+        """
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.max_rate = self.rate
+        self.min_rate = min(self.rate, min_rate if min_rate is not None else self.rate / 10)
+        self.tokens: float = float(capacity)
+        self.last_refill: float = time.monotonic()
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """取走一个令牌，令牌不足时阻塞到轮到本次请求为止"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+    def penalize(self) -> None:
+        """收到 429 时调用：补充速度减半，并清空积攒的突发额度"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * 0.5)
+            self.tokens = min(self.tokens, 0.0)
+            self._successes = 0
+
+    def reward(self) -> None:
+        """请求成功时调用：连续成功足够多次后逐步恢复补充速度"""
+        with self._lock:
+            if self.rate >= self.max_rate:
+                return
+            self._successes += 1
+            if self._successes >= self.RECOVER_EVERY:
+                self._successes = 0
+                self.rate = min(self.max_rate, self.rate * 1.1)
 
 
 class Downloader:
@@ -49,6 +131,12 @@ class Downloader:
         retry_delay: float = 1.0,
         base_interval: float = 1.0,
         interval_jitter: float = 1.0,
+        max_concurrency: int = 8,
+        burst: int = 5,
+        rate: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        cache_name: Optional[str] = None,
+        cache_expire_after: int = 3600,
     ):
         """
         初始化下载器
@@ -57,42 +145,93 @@ class Downloader:
             base_url: 基础URL
             retry_times: 重试次数
             retry_delay: 重试延迟（秒），用于指数退避的基数
-            base_interval: 相邻请求的基础间隔时间（秒）
-            interval_jitter: 在基础间隔上叠加的随机扰动（秒）
+            base_interval: 请求的平均间隔时间（秒），rate 为 None 时令牌桶按 1/base_interval 补充
+            interval_jitter: 每个请求发出前额外的随机延迟上限（秒），不占用令牌桶
+            max_concurrency: 多线程共用同一个下载器时，同时在途的请求数上限
+            burst: 令牌桶容量，空闲后允许连续发出的请求数
+            rate: 令牌桶补充速度（次/秒），None 表示 1/base_interval
+            min_rate: 连续收到 429 时补充速度下降的下限（次/秒），None 表示 rate 的 1/10
+            cache_name: HTTP 响应磁盘缓存（SQLite）的路径，默认 None 表示不缓存
+                （如目录解析器使用 "data/http_cache"）；需要安装 requests-cache
+            cache_expire_after: 缓存过期时间（秒），同时遵循服务器的 Cache-Control / ETag
         """
         self.base_url = base_url
         self.retry_times = retry_times
         self.retry_delay = retry_delay
         self.base_interval = base_interval
         self.interval_jitter = interval_jitter
-        # 上一次请求完成时间，用于全局限速
-        self._last_request_ts: float = 0.0
+        self.max_concurrency = max_concurrency
+        # 全局令牌桶：所有线程共享，既限制平均频率又允许小批量突发
+        if rate is None:
+            rate = 1.0 / base_interval if base_interval > 0 else float(burst)
+        self.bucket = TokenBucket(burst, rate, min_rate)
+        # 限制同时在途的请求数，多线程并发时对站点保持礼貌
+        self._concurrency = threading.BoundedSemaphore(max_concurrency)
+
+        # requests.Session 不保证线程安全：每个线程懒创建各自的 Session，
+        # 限速与并发上限仍由本下载器全局共享
+        # 连接池（urllib3，线程安全）则由所有 Session 共用同一个 HTTPAdapter：
+        # 线程/Session 新建时直接复用已建立的 keep-alive 连接，无需重新握手；
+        # 池大小与并发上限一致，不阻塞，重试由 _download 自行处理
+        self._adapter = HTTPAdapter(
+            pool_maxsize=max_concurrency,
+            pool_block=False,
+            max_retries=0,
+        )
+        self._local = threading.local()
+        # 只弱引用各线程的 Session：线程结束后 threading.local 释放其 Session，
+        # 这里不会随线程池反复创建线程而无限增长，close() 时关闭仍存活的即可
+        self._sessions: "weakref.WeakSet[requests.Session]" = weakref.WeakSet()
+        self._sessions_lock = threading.Lock()
+
+        # 所有线程的 CachedSession 共用同一个 SQLite 缓存后端
+        self.cache_expire_after = cache_expire_after
+        self._cache_backend = None
+        if cache_name and requests_cache is not None:
+            os.makedirs(os.path.dirname(cache_name) or ".", exist_ok=True)
+            self._cache_backend = requests_cache.SQLiteCache(cache_name)
+
+    @property
+    def session(self) -> requests.Session:
+        """当前线程专用的 Session（首次访问时创建）"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._new_session()
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.add(session)
+        return session
 
-        self.session = requests.Session()
-        # 这里设置的是“默认”请求头；每次请求时仍会随机选择 UA
-        self.session.headers.update(
+    def _new_session(self) -> requests.Session:
+        """创建一个带默认请求头的 Session（启用缓存时为 CachedSession）"""
+        if self._cache_backend is not None:
+            session = requests_cache.CachedSession(
+                backend=self._cache_backend,
+                expire_after=self.cache_expire_after,
+                cache_control=True,
+            )
+        else:
+            session = requests.Session()
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+        # 这里设置的是“默认”请求头；User-Agent 不在此设置，每次请求时随机选择
+        session.headers.update(
             {
-                "User-Agent": random.choice(USER_AGENTS),
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
                 "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                # 只使用 gzip/deflate（requests 内置支持）
-                "Accept-Encoding": "gzip, deflate",
+                # urllib3 能解压的编码：gzip/deflate，安装了 brotli 时还包括 br
+                "Accept-Encoding": ACCEPT_ENCODING,
                 "Connection": "keep-alive",
                 "Upgrade-Insecure-Requests": "1",
             }
         )
+        return session
 
     def _sleep_for_rate_limit(self) -> None:
-        """根据上一次请求时间和基础间隔，控制请求频率，加入随机抖动。"""
-        now = time.monotonic()
-        # 第一次请求不必等待
-        if self._last_request_ts <= 0:
-            return
-        # 基础间隔 + 随机扰动
-        interval = self.base_interval + random.uniform(0, self.interval_jitter)
-        elapsed = now - self._last_request_ts
-        if elapsed < interval:
-            time.sleep(interval - elapsed)
+        """从令牌桶取一个令牌，再叠加一段随机抖动，避免请求间隔过于规律"""
+        self.bucket.acquire()
+        if self.interval_jitter > 0:
+            time.sleep(random.uniform(0, self.interval_jitter))
     
     def download(self, url: str, timeout: int = 30) -> str:
         """
@@ -108,100 +247,145 @@ class Downloader:
         Raises:
             requests.RequestException: 如果请求失败
         """
+        return self._download(url, timeout)
+    
+    def download_bytes(self, url: str, timeout: int = 30) -> bytes:
+        """
+        下载网页内容，返回未解码的原始字节（已解除压缩）
+        
+        适合直接交给 lxml 等可处理字节的解析器，省去一次解码与重新编码。
+        
+        Args:
+            url: 要下载的URL（可以是相对路径或完整URL）
+            timeout: 超时时间（秒）
+        
+        Returns:
+            响应体字节
+        
+        Raises:
+            requests.RequestException: 如果请求失败
+        """
+        return self._download(url, timeout, as_bytes=True)
+    
+    def download_parsed(self, url: str, make_parser: Callable[[], Any], timeout: int = 30) -> Any:
+        """
+        边下载边解析：响应体按块（已解除压缩的字节）喂给增量解析器，返回 parser.close() 的结果
+        
+        不会在内存中同时保留完整的响应字节、解码后的文本和解析结果，适合超长页面；
+        解析也与网络传输重叠进行。启用磁盘缓存时本方法不读写缓存。make_parser 每次尝试都会被调用一次，
+        中途断线重试时不会把半截内容重复喂给同一个解析器。
+        
+        Args:
+            url: 要下载的URL（可以是相对路径或完整URL）
+            make_parser: 无参函数，返回带有 feed(bytes) / close() 的解析器，
+                如 lxml.etree.HTMLParser(target=...) 或 crawler.reorder.paragraph_parser
+            timeout: 超时时间（秒）
+        
+        Returns:
+            parser.close() 的返回值
+        
+        Raises:
+            requests.RequestException: 如果请求失败
+        """
+        return self._download(url, timeout, make_parser=make_parser)
+    
+    def download_many(
+        self,
+        urls: Sequence[str],
+        timeout: int = 30,
+        as_bytes: bool = False,
+    ) -> List[Union[str, bytes, Exception]]:
+        """
+        并发下载一批URL，结果顺序与 urls 一致
+
+        网络等待占了绝大部分时间，因此用线程池让多个请求同时在途；
+        限速、并发上限与重试仍走 download / download_bytes 的同一套逻辑，
+        对站点的总请求频率不会因此升高。
+
+        Args:
+            urls: 要下载的URL列表（可以是相对路径或完整URL）
+            timeout: 单个请求的超时时间（秒）
+            as_bytes: True 时返回原始字节（同 download_bytes），否则返回文本
+
+        Returns:
+            与 urls 一一对应的结果列表；某个URL重试后仍失败时，对应位置为该异常对象，
+            不会影响其余URL
+        """
+        if not urls:
+            return []
+
+        def fetch(url: str) -> Union[str, bytes, Exception]:
+            try:
+                return self._download(url, timeout, as_bytes=as_bytes)
+            except requests.RequestException as e:
+                return e
+
+        workers = min(len(urls), self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="downloader") as pool:
+            return list(pool.map(fetch, urls))
+
+    def _download(
+        self,
+        url: str,
+        timeout: int,
+        as_bytes: bool = False,
+        make_parser: Optional[Callable[[], Any]] = None,
+    ):
+        """download / download_bytes / download_parsed 的共同实现：限速、UA 轮换、重试与解码"""
         # 如果是相对路径，转换为完整URL
         if not url.startswith('http'):
             url = urljoin(self.base_url, url)
         
+        streaming = make_parser is not None
+        if self._cache_backend is not None and not streaming:
+            # 先只查本地缓存：命中（且未过期）时不占用令牌桶、不 sleep，也不发请求；
+            # 未命中时 requests-cache 返回 504，再走下面限速后的正常请求
+            response = self.session.get(url, timeout=timeout, only_if_cached=True)
+            if response.status_code != 504:
+                return self._read_response(response, as_bytes)
+        
         last_exception = None
         for attempt in range(self.retry_times):
             try:
-                # 全局限速：请求前先根据上次请求时间 sleep 一下
+                # 全局限速：请求前先从令牌桶取令牌
                 self._sleep_for_rate_limit()
 
-                # 每次请求随机一个 User-Agent，尽量伪装成不同的浏览器会话
-                headers = self.session.headers.copy()
-                headers["User-Agent"] = random.choice(USER_AGENTS)
+                # 每次请求随机一个 User-Agent，尽量伪装成不同的浏览器会话；
+                # 只传需要覆盖的这一项，其余请求头由 requests 与 Session 默认头合并
+                headers = {"User-Agent": USER_AGENTS[random.randrange(_UA_COUNT)]}
 
-                response = self.session.get(url, timeout=timeout, stream=False, headers=headers)
-                response.raise_for_status()
-                
-                # 检查Content-Type
-                content_type = response.headers.get('Content-Type', '').lower()
-                if 'text/html' not in content_type:
-                    print(f"警告: Content-Type不是text/html: {content_type}")
-                
-                # 检查Content-Encoding并处理
-                content_encoding = response.headers.get('Content-Encoding', '').lower()
-                if content_encoding:
-                    if 'br' in content_encoding:
-                        # Brotli压缩需要手动处理
-                        try:
-                            import brotli
-                            # 手动解压Brotli
-                            decompressed = brotli.decompress(response.content)
-                            # 检测编码并解码
-                            if response.encoding:
-                                text_content = decompressed.decode(response.encoding, errors='replace')
-                            else:
-                                # 尝试UTF-8
-                                text_content = decompressed.decode('utf-8', errors='replace')
-                            print(f"已手动解压Brotli内容")
-                        except ImportError:
-                            print(f"警告: 服务器返回Brotli压缩，但未安装brotli库。尝试重新请求（无压缩）")
-                            # 重新请求，不使用压缩
-                            headers_no_compression = self.session.headers.copy()
-                            headers_no_compression.pop('Accept-Encoding', None)
-                            response = self.session.get(url, timeout=timeout, headers=headers_no_compression)
-                            response.raise_for_status()
-                            text_content = response.text
-                        except Exception as e:
-                            print(f"警告: Brotli解压失败: {e}，尝试重新请求（无压缩）")
-                            # 重新请求，不使用压缩
-                            headers_no_compression = self.session.headers.copy()
-                            headers_no_compression.pop('Accept-Encoding', None)
-                            response = self.session.get(url, timeout=timeout, headers=headers_no_compression)
-                            response.raise_for_status()
-                            text_content = response.text
+                session = self.session
+                with self._concurrency:
+                    if streaming and self._cache_backend is not None:
+                        # CachedSession 会先把整个响应体读入内存再写缓存，流式解析失去意义；
+                        # 流式请求绕过缓存（Session 为当前线程独占，临时禁用不影响其他线程）
+                        with session.cache_disabled():
+                            response = session.get(url, timeout=timeout, stream=True, headers=headers)
                     else:
-                        # gzip/deflate由requests自动处理
-                        text_content = response.text
-                else:
-                    # 无压缩，直接使用text
-                    text_content = response.text
-                
-                # 验证内容是否是有效的HTML文本
-                if not isinstance(text_content, str):
-                    # 如果response.text不是字符串，说明可能有问题
-                    # 尝试手动解码
-                    text_content = response.content.decode(response.encoding or 'utf-8', errors='replace')
-                
-                # 验证内容是否以HTML开头
-                text_stripped = text_content.strip()
-                if not text_stripped.startswith('<!') and not text_stripped.startswith('<html'):
-                    # 可能是错误页面或其他内容
-                    print(f"警告: 内容可能不是HTML格式，前100字符: {text_content[:100]}")
-                
-                # 如果还没有设置编码，尝试检测
-                if not hasattr(response, '_encoding_set') or response.encoding is None or response.encoding.lower() == 'iso-8859-1':
-                    # 尝试从Content-Type或HTML meta标签检测编码
-                    if hasattr(response, 'apparent_encoding') and response.apparent_encoding:
-                        # 如果检测到新编码且内容不是Brotli解压的，重新解码
-                        if 'br' not in content_encoding:
-                            try:
-                                text_content = response.content.decode(response.apparent_encoding, errors='replace')
-                            except:
-                                pass  # 如果解码失败，使用已有的text_content
+                        response = session.get(url, timeout=timeout, stream=streaming, headers=headers)
+                    if streaming:
+                        # 读取响应体也算在途请求，放在并发上限之内
+                        with response:
+                            response.raise_for_status()
+                            parser = make_parser()
+                            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                                parser.feed(chunk)
+                response.raise_for_status()
                 
-                # 记录本次请求完成时间
-                self._last_request_ts = time.monotonic()
+                # 成功的请求让令牌桶逐步恢复被 429 降低的速度
+                self.bucket.reward()
 
-                return text_content
+                if streaming:
+                    return parser.close()
+                return self._read_response(response, as_bytes)
             except requests.RequestException as e:
                 last_exception = e
 
                 # 特判 429（Too Many Requests），适当延长等待时间
                 status = getattr(getattr(e, "response", None), "status_code", None)
                 if status == 429:
+                    # 之后所有线程的请求都按减半后的速度发出，而不只是本次重试等待
+                    self.bucket.penalize()
                     # 尝试读取 Retry-After 头；如果没有，就退避一段较长时间
                     retry_after = 0
                     try:
@@ -211,6 +395,8 @@ class Downloader:
                     wait_time = max(retry_after, self.retry_delay * (attempt + 1) * 3)
                     print(f"警告: 收到 429 Too Many Requests，等待 {wait_time:.1f}s 后重试: {url}")
                     time.sleep(wait_time)
+                elif status in PERMANENT_ERROR_STATUS:
+                    raise
                 else:
                     # 普通错误按指数退避
                     if attempt < self.retry_times - 1:
@@ -222,6 +408,28 @@ class Downloader:
         # 理论上不会到达这里，但为了类型检查
         raise last_exception
     
+    @staticmethod
+    def _read_response(response: requests.Response, as_bytes: bool) -> Union[str, bytes]:
+        """取出响应体：as_bytes 时返回字节，否则返回文本"""
+        if as_bytes:
+            # 压缩已由 urllib3 解开
+            return response.content
+        
+        # 站点统一使用 UTF-8：响应头未声明 charset 时 requests 会按 HTTP 规范
+        # 回退为 ISO-8859-1，这里在取 .text 之前改为 UTF-8，只解码一次，
+        # 也不必用 apparent_encoding（chardet 需扫描整个响应体）重新检测
+        if not response.encoding or response.encoding.lower() == 'iso-8859-1':
+            response.encoding = 'utf-8'
+        # 压缩（gzip/deflate/br）已由 urllib3 解开，直接取文本；
+        # 内容是否为有效页面由下游解析器判断，这里不再逐个检查响应头与开头字符
+        return response.text
+    
     def close(self):
-        """关闭session"""
-        self.session.close()
+        """关闭所有线程创建的session"""
+        with self._sessions_lock:
+            sessions = list(self._sessions)
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        self._adapter.close()
+        self._local = threading.local()
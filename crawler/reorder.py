@@ -16,75 +16,76 @@
 """
 
 import re
-from html.parser import HTMLParser
-from typing import List, Tuple, Optional
+from typing import List, Optional, Tuple
 
+from lxml import etree
+from lxml import html as lxml_html
+
+# #TextContent 下任意深度的 <p>（id() 直接查 libxml2 的 ID 索引，不扫描整棵树）
+_TEXT_CONTENT_P_XPATH = etree.XPath("id('TextContent')//p")
+# 广告/无效段落：【新成品】等【】标记、"手工砖块"、"广告"开头、google 广告脚本
+# （合并为一个正则，一次 search 完成判断；^【.*】 已涵盖 ^【.*】$，google 已涵盖 adsbygoogle）
+_INVALID_RE = re.compile(r'^【.*】|^手工砖块$|^广告|google', re.IGNORECASE)
+
+
+def _is_valid_paragraph(text: str) -> bool:
+    """判断是否为有效的段落文本（过短的文本同样视为无效）"""
+    return len(text) >= 3 and _INVALID_RE.search(text) is None
+
+
+class _ParagraphTarget:
+    """lxml 解析器 target：不构建 DOM 树，直接收集 #TextContent 下各 <p> 的文本
+
+    与 extract_paragraphs 的结果一致（包含 <p> 内嵌套标签的文字，过滤规则相同）。
+    """
 
-class ParagraphExtractor(HTMLParser):
-    """HTML解析器，用于从 #TextContent 中提取段落"""
-    
     def __init__(self):
-        super().__init__()
-        self.paragraphs: List[Tuple[str, int]] = []
-        self.in_text_content = False
-        self.current_text = ""
-        self.in_p_tag = False
-        self.depth = 0
-    
-    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]):
-        """处理开始标签"""
-        if tag == 'div':
-            # 检查是否是 TextContent
-            for attr_name, attr_value in attrs:
-                if attr_name == 'id' and attr_value == 'TextContent':
-                    self.in_text_content = True
-                    self.depth += 1
-                    return
-            if self.in_text_content:
-                self.depth += 1
-        elif tag == 'p' and self.in_text_content:
-            self.in_p_tag = True
-            self.current_text = ""
-    
-    def handle_endtag(self, tag: str):
-        """处理结束标签"""
-        if tag == 'div' and self.in_text_content:
-            self.depth -= 1
-            if self.depth == 0:
-                self.in_text_content = False
-        elif tag == 'p' and self.in_p_tag:
-            text = self.current_text.strip()
+        self.paragraphs: List[str] = []
+        self._depth = 0  # 在 #TextContent 内的嵌套深度，0 表示不在正文内
+        self._p_depth = 0  # 当前 <p> 开始时的深度，0 表示不在 <p> 内
+        self._parts: List[str] = []
+
+    def start(self, tag: str, attrib) -> None:
+        if self._depth:
+            self._depth += 1
+            if tag == 'p' and not self._p_depth:
+                self._p_depth = self._depth
+                self._parts = []
+        elif attrib.get('id') == 'TextContent':
+            self._depth = 1
+
+    def end(self, tag: str) -> None:
+        if not self._depth:
+            return
+        if self._p_depth and self._depth == self._p_depth:
+            text = ''.join(self._parts).strip()
             if text and _is_valid_paragraph(text):
-                self.paragraphs.append((text, len(self.paragraphs)))
-            self.in_p_tag = False
-            self.current_text = ""
-    
-    def handle_data(self, data: str):
-        """处理文本数据"""
-        if self.in_p_tag:
-            self.current_text += data
+                self.paragraphs.append(text)
+            self._p_depth = 0
+        self._depth -= 1
 
+    def data(self, data: str) -> None:
+        if self._p_depth:
+            self._parts.append(data)
 
-def _is_valid_paragraph(text: str) -> bool:
-    """判断是否为有效的段落文本"""
-    invalid_patterns = [
-        r'^【.*】$',  # 【新成品】
-        r'^手工砖块$',
-        r'^广告',
-        r'google',
-        r'adsbygoogle',
-        r'^【.*】',  # 其他广告标记
-    ]
+    def close(self) -> List[str]:
+        return self.paragraphs
+
+
+def paragraph_parser(encoding: Optional[str] = 'utf-8') -> etree.HTMLParser:
+    """
+    创建一个增量段落解析器：可多次 feed() HTML 片段，close() 返回段落文本列表
     
-    for pattern in invalid_patterns:
-        if re.search(pattern, text, re.IGNORECASE):
-            return False
+    不构建 DOM 树，配合 Downloader.download_parsed 可以边下载边提取段落，
+    超长页面的峰值内存只与段落文本本身相当。
     
-    # 过滤过短的文本
-    if len(text) < 3:
-        return False
+    Args:
+        encoding: 输入字节的编码（站点统一为 UTF-8），None 表示由 libxml2 自动检测
     
-    return True
+    Returns:
+        lxml HTMLParser；close() 返回与 extract_paragraphs 相同的段落列表（可能为空）
+    """
+    return etree.HTMLParser(target=_ParagraphTarget(), encoding=encoding)
 
 
 def extract_paragraphs(html_content: str) -> List[str]:
@@ -100,14 +101,19 @@ def extract_paragraphs(html_content: str) -> List[str]:
     Raises:
         ValueError: 如果无法从 #TextContent 中提取段落
     """
-    parser = ParagraphExtractor()
-    parser.feed(html_content)
+    try:
+        tree = lxml_html.fromstring(html_content)
+    except (etree.ParserError, ValueError) as e:
+        raise ValueError(f"无法从 #TextContent 中提取段落: {e}") from e
+    
+    # text_content() 包含 <p> 内嵌套标签的文字
+    texts = (node.text_content().strip() for node in _TEXT_CONTENT_P_XPATH(tree))
+    paragraphs = [text for text in texts if text and _is_valid_paragraph(text)]
     
-    if not parser.paragraphs:
+    if not paragraphs:
         raise ValueError("无法从 #TextContent 中提取段落")
     
-    # 只返回文本，不返回索引
-    return [text for text, _ in parser.paragraphs]
+    return paragraphs
 
 
 def reorder_chapter_content(html_content: str) -> str:
@@ -24,61 +24,58 @@
        - `chapter.needs_resolve = False`。
 
 设计约束：
-    - 不使用 Selenium，仅依赖纯 HTTP + HTML 解析；
+    - 不使用 Selenium，仅依赖纯 HTTP + 对原始 HTML 的正则匹配（不构建 DOM）；
     - 不下载正文，只负责“补 URL”；
     - 所有 HTTP 调用统一通过 Downloader，继承其节流、重试与 UA 策略；
+    - 互不依赖的异常章节通过线程池并发解析，网络等待相互重叠；
     - 解析失败不会中断整个目录流程，只打印带前缀的日志，便于后续分析。
 """
 
 from __future__ import annotations
 
 import re
-from typing import Dict, Optional, Tuple
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-
 from .downloader import Downloader
 
 
+# 章节页URL相关的正则表达式在此统一定义，chapter_parser 也从这里导入
+# 匹配 var nextpage="..." 的正则表达式
 NEXT_PAGE_VAR_PATTERN = re.compile(r'var\s+nextpage\s*=\s*"([^"]+)"')
-CHAPTER_ID_PATTERN = re.compile(r"/novel/(\d+)/(\d+)(?:_\d+)?\.html")
+# 匹配章节ID的正则表达式：(article_id, chapter_id, 分页页码如"2"，第一页为None)
+CHAPTER_ID_PATTERN = re.compile(r"/novel/(\d+)/(\d+)(?:_(\d+))?\.html")
 
 
-def _extract_article_and_chapter(path_or_url: str) -> Optional[Tuple[str, str]]:
-    """从路径或URL中提取 (article_id, chapter_id_base)。
+@lru_cache(maxsize=4096)
+def _extract_article_and_chapter(path_or_url: str) -> Optional[Tuple[str, str, int]]:
+    """从路径或URL中提取 (article_id, chapter_id_base, 页码)。
 
+    页码没有 `_N` 后缀时为 1。纯函数，结果按URL缓存（多线程共享）。
     示例：
-    - /novel/4519/262081.html      -> ("4519", "262081")
-    - /novel/4519/262081_2.html    -> ("4519", "262081")
-    - https://.../novel/4519/262081_3.html -> ("4519", "262081")
+    - /novel/4519/262081.html      -> ("4519", "262081", 1)
+    - /novel/4519/262081_2.html    -> ("4519", "262081", 2)
+    - https://.../novel/4519/262081_3.html -> ("4519", "262081", 3)
     """
     m = CHAPTER_ID_PATTERN.search(path_or_url)
     if not m:
         return None
-    return m.group(1), m.group(2)
+    article_id, chapter_id, page = m.groups()
+    return article_id, chapter_id, int(page) if page else 1
 
 
 def _extract_nextpage_path(html: str) -> Optional[str]:
     """从章节 HTML 中提取 nextpage 路径（如果存在）。
 
-    优先从 <script> 中查找 `var nextpage="..."`。
+    `var nextpage="..."` 只出现在页面脚本中，直接对原始 HTML 做一次正则搜索即可，
+    不必为此构建整棵 DOM 树。
     退而求其次，可以考虑从分页导航中的“下一页”链接提取，但目前 examples
     显示 JS 变量足够使用。
     """
-    soup = BeautifulSoup(html, "lxml")
-
-    scripts_text = []
-    for sc in soup.find_all("script"):
-        t = sc.get_text() or ""
-        if "nextpage" in t:
-            scripts_text.append(t)
-
-    if not scripts_text:
-        return None
-
-    joined = "\n".join(scripts_text)
-    m = NEXT_PAGE_VAR_PATTERN.search(joined)
+    m = NEXT_PAGE_VAR_PATTERN.search(html)
     if not m:
         return None
     return m.group(1)
@@ -107,8 +104,11 @@ def resolve_next_chapter_url(
         print(f"[special_resolver] 无法从上一章URL中提取章节ID: {prev_chapter_url}")
         return None
 
-    article_id, chapter_base = ids
+    article_id, chapter_base, _page = ids
+    # 已访问的页面：以 (article_id, chapter_id, 页码) 为键，
+    # 相对/绝对URL或不同域名写法指向同一页时也能识别出循环
     visited = set()
+    page_key = ids
 
     # current_url 始终指向“当前页”的 URL（第一页 / 第二页 / ...）
     current_url = prev_chapter_url
@@ -118,10 +118,10 @@ def resolve_next_chapter_url(
         if not full_url.startswith("http"):
             full_url = urljoin(base_url, full_url)
 
-        if full_url in visited:
+        if page_key in visited:
             print(f"[special_resolver] 检测到循环，终止: {full_url}")
             return None
-        visited.add(full_url)
+        visited.add(page_key)
 
         try:
             html = downloader.download(full_url)
@@ -141,7 +141,7 @@ def resolve_next_chapter_url(
             print(f"[special_resolver] 无法从 nextpage 中提取章节ID: {next_path}")
             return None
 
-        article_id2, chapter2 = ids2
+        article_id2, chapter2, _page2 = ids2
         if article_id2 != article_id:
             # 跨书籍了，不合理
             print(
@@ -153,6 +153,7 @@ def resolve_next_chapter_url(
         if chapter2 == chapter_base:
             # 仍然是同一章（不同分页），继续向后追踪
             current_url = next_path
+            page_key = ids2
             continue
 
         # chapter id 发生变化 => 认为跳到了“下一章”的第一页
@@ -172,10 +173,23 @@ def resolve_all_special_chapters(
     book_structure: Dict,
     downloader: Downloader,
     base_url: str = "https://www.linovelib.com",
+    max_workers: int = 16,
+    stagger: float = 0.1,
 ) -> None:
     """在目录结构中解析所有 `needs_resolve == True` 的章节。
 
+    连续的异常章节组成一条“链”：链中后一章的“上一章”就是前一个刚解析出的章节，
+    因此链内只能串行解析；不同的链互不依赖，提交到线程池并发解析。
+    并发请求数与请求间隔仍由共享的 Downloader 统一控制。
+
     就地修改 book_structure，不返回值。
+
+    Args:
+        book_structure: 书籍结构字典
+        downloader: 已配置好的 HTTP 下载器（需可在多线程中共享）
+        base_url: 站点基础 URL
+        max_workers: 线程池的最大线程数
+        stagger: 相邻两条链开始解析的错开时间（秒），避免瞬间并发
     """
     volumes = book_structure.get("volumes") or []
 
@@ -193,10 +207,20 @@ def resolve_all_special_chapters(
                     return v, c, ch
         return None
 
+    # 收集所有链：(上一章, [链中的异常章节...])
+    chains: List[Tuple[Dict, List[Dict]]] = []
+    # 当前正在收集的链；None 表示上一个章节不是（可解析的）异常章节
+    current_chain: Optional[List[Dict]] = None
     for vi, vol in enumerate(volumes):
         chapters = vol.get("chapters") or []
         for ci, ch in enumerate(chapters):
             if not ch.get("needs_resolve"):
+                current_chain = None
+                continue
+
+            if current_chain is not None:
+                # 紧跟在另一个异常章节之后，归入同一条链
+                current_chain.append(ch)
                 continue
 
             # 查找上一章
@@ -209,14 +233,22 @@ def resolve_all_special_chapters(
                 continue
 
             _pv, _pc, prev_ch = prev_info
-            prev_url = prev_ch.get("url")
-            if not prev_url or prev_url == "javascript:cid(0)":
-                print(
-                    f"[special_resolver] 上一章URL无效，放弃解析: "
-                    f"prev_title={prev_ch.get('title')}, prev_url={prev_url}"
-                )
-                continue
+            current_chain = [ch]
+            chains.append((prev_ch, current_chain))
 
+    if not chains:
+        return
+
+    def resolve_chain(prev_ch: Dict, members: List[Dict]) -> None:
+        prev_url = prev_ch.get("url")
+        if not prev_url or prev_url == "javascript:cid(0)":
+            print(
+                f"[special_resolver] 上一章URL无效，放弃解析: "
+                f"prev_title={prev_ch.get('title')}, prev_url={prev_url}"
+            )
+            return
+
+        for ch in members:
             resolved_url = resolve_next_chapter_url(
                 prev_chapter_url=prev_url,
                 downloader=downloader,
@@ -227,7 +259,8 @@ def resolve_all_special_chapters(
                     f"[special_resolver] 未能解析异常章节URL: "
                     f"title={ch.get('title')}, 原始url={ch.get('url')}"
                 )
-                continue
+                # 链中后续章节依赖本章的URL，无法继续
+                return
 
             # 更新章节结构
             original_url = ch.get("url")
@@ -239,4 +272,23 @@ def resolve_all_special_chapters(
                 f"[special_resolver] 已更新章节URL: "
                 f"title={ch.get('title')}, original={original_url}, resolved={resolved_url}"
             )
-
+            prev_url = resolved_url
+
+    workers = max(1, min(max_workers, len(chains)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="special-resolver") as executor:
+        futures = {}
+        for i, (prev_ch, members) in enumerate(chains):
+            if i and stagger > 0:
+                time.sleep(stagger)
+            futures[executor.submit(resolve_chain, prev_ch, members)] = prev_ch
+
+        # 按完成顺序收集结果（章节结构已在各线程中就地更新），出错的链立即报告，
+        # 不必等待排在前面的慢链
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(
+                    f"[special_resolver] 解析异常章节链时出错: "
+                    f"prev_title={futures[future].get('title')}, 错误: {e}"
+                )
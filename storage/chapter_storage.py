@@ -4,11 +4,16 @@
     - 管理章节内容的存储和读取
     - 支持按书籍ID和章节序号存储
     - 支持增量下载（检查章节是否已下载）
+
+存储格式：
+    每章一个文件 `{chapter_index}.md`，第一行为 `# 标题`，空一行后是正文。
+    旧版本的 `{chapter_index}_title.txt` + `{chapter_index}_content.md` 两个文件仍可读取，
+    同一章两种格式都存在时以新格式为准。
 """
 
 import os
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Set, Tuple
 
 
 class ChapterStorage:
@@ -28,26 +33,42 @@ class ChapterStorage:
         
         # 确保目录存在
         self.book_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 已下载章节序号的缓存：首次查询时扫描一次目录，之后由 save_chapter 维护
+        self._downloaded: Optional[Set[int]] = None
+    
+    def _chapter_file(self, chapter_index: int) -> Path:
+        """章节文件路径"""
+        return self.book_dir / f"{chapter_index}.md"
+    
+    def _legacy_files(self, chapter_index: int) -> Tuple[Path, Path]:
+        """旧格式的 (标题文件, 内容文件) 路径"""
+        return (
+            self.book_dir / f"{chapter_index}_title.txt",
+            self.book_dir / f"{chapter_index}_content.md",
+        )
     
     def save_chapter(self, chapter_index: int, title: str, content: str) -> None:
         """
         保存章节内容
         
+        标题与正文写入同一个文件，每章只需一次打开/写入/关闭。
+        先写入临时文件再用 os.replace 替换，进程中途被终止时不会留下不完整的章节
+        （只会留下被忽略的 `.tmp` 文件），断点续传时也不会把半截章节当作已下载。
+        
         Args:
             chapter_index: 章节序号（从1开始）
             title: 章节标题
             content: 章节内容（Markdown格式纯文本）
         """
-        title_file = self.book_dir / f"{chapter_index}_title.txt"
-        content_file = self.book_dir / f"{chapter_index}_content.md"
-        
-        # 保存标题
-        with open(title_file, 'w', encoding='utf-8') as f:
-            f.write(title)
-        
-        # 保存内容
-        with open(content_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # 标题必须保持在第一行
+        title = title.strip().replace("\n", " ")
+        chapter_file = self._chapter_file(chapter_index)
+        tmp_file = chapter_file.with_name(chapter_file.name + '.tmp')
+        tmp_file.write_text(f"# {title}\n\n{content}", encoding='utf-8')
+        os.replace(tmp_file, chapter_file)
+        if self._downloaded is not None:
+            self._downloaded.add(chapter_index)
     
     def load_chapter(self, chapter_index: int) -> Optional[Tuple[str, str]]:
         """
@@ -59,51 +80,75 @@ class ChapterStorage:
         Returns:
             (title, content) 元组，如果章节不存在则返回None
         """
-        title_file = self.book_dir / f"{chapter_index}_title.txt"
-        content_file = self.book_dir / f"{chapter_index}_content.md"
-        
-        if not title_file.exists() or not content_file.exists():
-            return None
-        
+        chapter_file = self._chapter_file(chapter_index)
         try:
-            with open(title_file, 'r', encoding='utf-8') as f:
-                title = f.read().strip()
+            if chapter_file.exists():
+                text = chapter_file.read_text(encoding='utf-8')
+                # 第一行是 "# 标题"，其后空一行才是正文
+                head, _, content = text.partition("\n")
+                title = head[2:] if head.startswith("# ") else head
+                if content.startswith("\n"):
+                    content = content[1:]
+                return (title.strip(), content)
             
-            with open(content_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # 兼容旧格式
+            title_file, content_file = self._legacy_files(chapter_index)
+            if not title_file.exists() or not content_file.exists():
+                return None
             
-            return (title, content)
+            return (title_file.read_text(encoding='utf-8').strip(), content_file.read_text(encoding='utf-8'))
         except Exception as e:
             print(f"警告: 加载章节 {chapter_index} 失败: {e}")
             return None
     
+    def _scan_downloaded(self) -> Set[int]:
+        """扫描一次目录，返回已下载的章节序号集合（并更新缓存）
+
+        os.scandir 只读取目录项，不必逐个文件 stat。
+        """
+        new_format = set()
+        legacy_titles = set()
+        legacy_contents = set()
+        with os.scandir(self.book_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.endswith("_title.txt"):
+                    stem, target = name[:-len("_title.txt")], legacy_titles
+                elif name.endswith("_content.md"):
+                    stem, target = name[:-len("_content.md")], legacy_contents
+                elif name.endswith(".md"):
+                    stem, target = name[:-3], new_format
+                else:
+                    continue
+                if stem.isdigit():
+                    target.add(int(stem))
+        # 旧格式需要标题与内容文件同时存在
+        downloaded = new_format | (legacy_titles & legacy_contents)
+        self._downloaded = downloaded
+        return downloaded
+    
     def chapter_exists(self, chapter_index: int) -> bool:
         """
         检查章节是否已下载
         
+        首次调用时扫描一次目录，之后为集合查找，不再访问磁盘。
+        
         Args:
             chapter_index: 章节序号
         
         Returns:
             如果章节存在返回True，否则返回False
         """
-        title_file = self.book_dir / f"{chapter_index}_title.txt"
-        content_file = self.book_dir / f"{chapter_index}_content.md"
-        return title_file.exists() and content_file.exists()
+        downloaded = self._downloaded
+        if downloaded is None:
+            downloaded = self._scan_downloaded()
+        return chapter_index in downloaded
     
     def get_downloaded_chapters(self) -> list[int]:
         """
-        获取已下载的章节序号列表
+        获取已下载的章节序号列表（每次调用都会重新扫描目录）
         
         Returns:
             章节序号列表（已排序）
         """
-        chapters = []
-        for file in self.book_dir.glob("*_title.txt"):
-            try:
-                index = int(file.stem.split('_')[0])
-                chapters.append(index)
-            except ValueError:
-                continue
-        
-        return sorted(chapters)
+        return sorted(self._scan_downloaded())
@@ -0,0 +1,139 @@
+"""书籍结构存储
+
+功能：
+    - 以 MessagePack 列式格式保存书籍结构（`data/books/{book_id}_structure.msgpack`）
+    - 读取书籍结构，并还原为与 JSON 格式完全相同的字典
+
+列式格式说明：
+    JSON 中每个章节都重复携带 "index"/"title"/"url"/"needs_resolve" 键名，长篇小说的
+    结构文件因此体积较大。列式格式把每卷的章节拆成平行数组：
+
+        "chapters": {
+            "first_index": 1,                 # 章节序号全局连续，只记录起始值
+            "titles": [...],
+            "urls": [...],
+            "needs_resolve_mask": b"...",     # 位图，第 i 位对应第 i 个章节
+            "original_urls": [[i, url], ...]  # 仅记录被特殊解析过的章节
+        }
+
+    读取时按需还原为普通的章节字典列表，调用方无需关心存储格式。
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖：未安装时调用方应退回 JSON 格式
+    msgpack = None
+
+HAS_MSGPACK = msgpack is not None
+
+
+def _pack_chapters(chapters: List[Dict]) -> Dict:
+    """将章节字典列表转换为列式结构"""
+    mask = bytearray((len(chapters) + 7) // 8)
+    original_urls = []
+    for i, ch in enumerate(chapters):
+        if ch.get("needs_resolve"):
+            mask[i >> 3] |= 1 << (i & 7)
+        if "original_url" in ch:
+            original_urls.append([i, ch["original_url"]])
+
+    first_index = chapters[0]["index"] if chapters else 1
+    indices = [ch["index"] for ch in chapters]
+    columns = {
+        "first_index": first_index,
+        "titles": [ch.get("title") for ch in chapters],
+        "urls": [ch.get("url") for ch in chapters],
+        "needs_resolve_mask": bytes(mask),
+        "original_urls": original_urls,
+    }
+    # 正常情况下序号连续；不连续时（如手工编辑过）才完整记录
+    if indices != list(range(first_index, first_index + len(chapters))):
+        columns["indices"] = indices
+    return columns
+
+
+def _unpack_chapters(columns: Dict) -> List[Dict]:
+    """将列式结构还原为章节字典列表"""
+    titles = columns["titles"]
+    urls = columns["urls"]
+    mask = columns["needs_resolve_mask"]
+    indices = columns.get("indices") or range(
+        columns["first_index"], columns["first_index"] + len(titles)
+    )
+
+    chapters = [
+        {
+            "index": index,
+            "title": title,
+            "url": url,
+            "needs_resolve": bool(mask[i >> 3] & (1 << (i & 7))),
+        }
+        for i, (index, title, url) in enumerate(zip(indices, titles, urls))
+    ]
+    for i, original_url in columns.get("original_urls") or []:
+        chapters[i]["original_url"] = original_url
+    return chapters
+
+
+def pack_structure(structure: Dict) -> bytes:
+    """将书籍结构序列化为 MessagePack 列式格式
+
+    Raises:
+        RuntimeError: 如果未安装 msgpack
+    """
+    if msgpack is None:
+        raise RuntimeError("未安装 msgpack，无法使用 MessagePack 格式")
+    packed = dict(structure)
+    packed["volumes"] = []
+    for volume in structure.get("volumes") or []:
+        vol = dict(volume)
+        vol["chapters"] = _pack_chapters(volume.get("chapters") or [])
+        packed["volumes"].append(vol)
+    return msgpack.packb(packed, use_bin_type=True)
+
+
+def unpack_structure(data: bytes) -> Dict:
+    """从 MessagePack 列式格式还原书籍结构字典
+
+    Raises:
+        RuntimeError: 如果未安装 msgpack
+    """
+    if msgpack is None:
+        raise RuntimeError("未安装 msgpack，无法读取 MessagePack 格式")
+    structure = msgpack.unpackb(data, raw=False)
+    for volume in structure.get("volumes") or []:
+        volume["chapters"] = _unpack_chapters(volume["chapters"])
+    return structure
+
+
+def load_structure(book_id: str, base_dir: str = "data/books") -> Optional[Dict]:
+    """读取书籍结构
+
+    同时存在 `.msgpack` 与 `.json` 时读取较新的一个；只存在其一时读取该文件。
+
+    Args:
+        book_id: 书籍ID
+        base_dir: 书籍结构文件所在目录
+
+    Returns:
+        书籍结构字典，如果结构文件不存在则返回None
+    """
+    base = Path(base_dir)
+    msgpack_file = base / f"{book_id}_structure.msgpack"
+    json_file = base / f"{book_id}_structure.json"
+
+    candidates = [f for f in (msgpack_file, json_file) if f.exists()]
+    if msgpack is None and msgpack_file in candidates:
+        candidates.remove(msgpack_file)
+    if not candidates:
+        return None
+
+    latest = max(candidates, key=lambda f: f.stat().st_mtime)
+    if latest == msgpack_file:
+        return unpack_structure(msgpack_file.read_bytes())
+    with open(json_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
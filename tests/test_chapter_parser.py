@@ -0,0 +1,206 @@
+"""ChapterParser HTTP 快速路径的本地测试（使用 examples/ 与 test_loaddiff/ 中保存的页面，不启动浏览器）
+
+运行：python -m unittest（在仓库根目录；需要安装 selenium）
+"""
+
+import unittest
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    from crawler import chapter_parser
+except ImportError:  # 未安装 selenium / webdriver-manager
+    chapter_parser = None
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+# 服务器返回的原始页面中标记动态重排序的脚本
+MARK_SCRIPT = b'<script>mark("mid");</script>'
+RENDERED_HTML = '<html><body><div id="TextContent"><p>浏览器渲染</p></div></body></html>'
+
+
+def _sample(relative_path: str, static: bool = False) -> bytes:
+    """读取保存的页面；static=True 时去掉 mark("mid") 脚本，即不需要重排序的静态章节页"""
+    page_html = (REPO_DIR / relative_path).read_bytes()
+    if static:
+        page_html = page_html.replace(MARK_SCRIPT, b'')
+    return page_html
+
+
+class _FakeDownloader:
+    """按路径返回预先准备的页面，其余路径返回 404"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def download_bytes(self, url: str) -> bytes:
+        path = urlsplit(url).path
+        self.requested.append(path)
+        if path not in self.pages:
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.HTTPError(f"404 Client Error: {url}", response=response)
+        return self.pages[path]
+
+    def close(self) -> None:
+        pass
+
+
+class _FakeDriver:
+    """只记录访问过的URL；渲染结果由测试替换 _wait_for_page_load / _page_html 提供"""
+
+    page_source = ''
+
+    def __init__(self):
+        self.visited = []
+
+    def get(self, url: str) -> None:
+        self.visited.append(url)
+
+    def quit(self) -> None:
+        pass
+
+
+@unittest.skipIf(chapter_parser is None, '未安装 selenium')
+class HttpFastPathTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = chapter_parser.ChapterParser()
+        self.driver = _FakeDriver()
+        # 记录启动浏览器的次数：只有需要渲染的页面才应该创建WebDriver
+        patcher = mock.patch.object(self.parser, '_init_driver', return_value=self.driver)
+        self.init_driver = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.drivers = chapter_parser._DriverPool(self.parser, 2)
+        self.addCleanup(self.drivers.close)
+        patcher = mock.patch.object(self.parser, '_wait_for_page_load')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(self.parser, '_page_html', return_value=RENDERED_HTML)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.parser.close)
+
+    def _serve(self, pages):
+        self.parser.downloader.close()
+        self.parser.downloader = _FakeDownloader(pages)
+
+    def test_sample_pages_are_not_blocked(self):
+        # 正常页面都引用了 cloudflareinsights 统计脚本与 challenge-platform 检测脚本
+        for relative_path in ('examples/262081.html', 'test_loaddiff/static.html', 'test_loaddiff/dynamic.html'):
+            with self.subTest(relative_path):
+                self.assertFalse(chapter_parser._is_blocked(_sample(relative_path)))
+
+    def test_block_pages_are_detected(self):
+        for page_html in (
+            b'<html><head><title>Just a moment...</title></head><body></body></html>',
+            b'<html><head><title>Attention Required! | Cloudflare</title></head>'
+            b'<body><div id="cf-error-details"><h1>Sorry, you have been blocked</h1></div></body></html>',
+            '<div id="cf-challenge-running">请稍候</div>',
+        ):
+            with self.subTest(page_html):
+                self.assertTrue(chapter_parser._is_blocked(page_html))
+
+    def test_static_page_uses_http(self):
+        page_html = _sample('test_loaddiff/static.html', static=True)
+        self._serve({'/novel/4519/262729.html': page_html})
+
+        result = self.parser._fetch_page(self.drivers, '/novel/4519/262729.html', first_page=True)
+
+        self.assertEqual(result, page_html)
+        self.assertEqual(self.driver.visited, [])
+        self.init_driver.assert_not_called()
+
+    def test_dynamic_page_falls_back_to_browser(self):
+        self._serve({'/novel/4519/262729.html': _sample('test_loaddiff/static.html')})
+
+        result = self.parser._fetch_page(self.drivers, '/novel/4519/262729.html', first_page=True)
+
+        self.assertEqual(result, RENDERED_HTML)
+        self.assertEqual(self.driver.visited, ['/novel/4519/262729.html'])
+        self.init_driver.assert_called_once()
+
+    def test_static_multipage_chapter_skips_browser(self):
+        # 多页章节：第一页与 _2、_3 后续页都走HTTP快速路径；_3 的 nextpage 指向下一章
+        pages = {
+            f'/novel/4519/{name}.html': _sample(f'examples/{name}.html', static=True)
+            for name in ('262081', '262081_2', '262081_3')
+        }
+        self._serve(pages)
+
+        content = self.parser._download_chapter_content(self.drivers, '/novel/4519/262081.html')
+
+        self.assertEqual(self.driver.visited, [])
+        self.init_driver.assert_not_called()
+        self.assertEqual(self.parser.downloader.requested, list(pages))
+        for page_html in pages.values():
+            first_paragraph = self.parser._extract_paragraphs_with_spacing(
+                self.parser._parse_page(page_html)
+            )[0][0]
+            self.assertIn(first_paragraph, content)
+
+
+
+@unittest.skipIf(chapter_parser is None, '未安装 selenium')
+class DriverPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.parser = chapter_parser.ChapterParser(http_fast_path=False)
+        patcher = mock.patch.object(self.parser, '_init_driver', side_effect=lambda: _FakeDriver())
+        self.init_driver = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.parser.close)
+
+    def test_drivers_are_created_on_first_borrow_and_reused(self):
+        drivers = chapter_parser._DriverPool(self.parser, 3)
+        self.init_driver.assert_not_called()
+        with drivers.borrow() as first:
+            pass
+        with drivers.borrow() as second:
+            pass
+        drivers.close()
+        self.assertIs(first, second)
+        self.assertIs(first, self.parser.driver)
+        self.init_driver.assert_called_once()
+
+    def test_concurrent_borrows_create_up_to_size(self):
+        drivers = chapter_parser._DriverPool(self.parser, 2)
+        with drivers.borrow() as first, drivers.borrow() as second:
+            self.assertIsNot(first, second)
+        drivers.close()
+        self.assertEqual(self.init_driver.call_count, 2)
+
+
+@unittest.skipIf(chapter_parser is None, '未安装 selenium')
+class WaitForReorderTest(unittest.TestCase):
+    """动态页面（含 mark("mid")）等待重排序的结果处理；页面内脚本的返回值由 mock 的 WebDriver 提供"""
+
+    def setUp(self):
+        self.parser = chapter_parser.ChapterParser(http_fast_path=False)
+        patcher = mock.patch.object(chapter_parser, 'WebDriverWait')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _driver(self, result):
+        driver = mock.Mock()
+        driver.execute_script.return_value = True  # 页面含 mark("mid")
+        driver.execute_async_script.return_value = result
+        return driver
+
+    def test_no_reorder_is_a_failure(self):
+        driver = self._driver({'text': '打乱的第一段', 'hit': False, 'mutated': False, 'waited': 25.0})
+        with self.assertRaises(chapter_parser.ParseError):
+            self.parser._wait_for_page_load(driver)
+
+    def test_reorder_without_keyword_is_accepted(self):
+        driver = self._driver({'text': '重排后的第一段', 'hit': False, 'mutated': True, 'waited': 6.5})
+        self.parser._wait_for_page_load(driver)
+
+    def test_keyword_hit_is_accepted(self):
+        driver = self._driver({'text': '她懒散地躺在那里', 'hit': True, 'mutated': False, 'waited': 0.0})
+        self.parser._wait_for_page_load(driver)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Downloader 的本地测试（使用本机临时 HTTP 服务器，不访问真实站点）
+
+运行：python -m unittest（在仓库根目录）
+"""
+
+import http.server
+import os
+import tempfile
+import threading
+import tracemalloc
+import unittest
+
+import requests
+
+from crawler import reorder
+from crawler.downloader import Downloader, requests_cache
+
+# 约 8MB 的页面，但只有少量正文段落：解析结果很小，内存峰值主要取决于是否缓冲了整个响应体
+_PARAGRAPHS = 10
+_BODY = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"></head><body><div id="TextContent">'
+    + ''.join(f'<p>第{i}段正文</p>' for i in range(_PARAGRAPHS))
+    + '<div class="ad">广告位，这里是一段用于撑大页面体积的填充文字。</div>' * 120000
+    + '</div></body></html>'
+).encode('utf-8')
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # 每个路径收到的请求数
+    hits = {}
+
+    def do_GET(self):
+        _Handler.hits[self.path] = _Handler.hits.get(self.path, 0) + 1
+        if self.path == '/missing.html':
+            self.send_error(404)
+            return
+        if self.path == '/challenge.html' and _Handler.hits[self.path] == 1:
+            # 第一次请求返回 403（模拟临时的人机验证），之后正常返回
+            self.send_error(403)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(_BODY)))
+        self.end_headers()
+        self.wfile.write(_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _LocalServerTestCase(unittest.TestCase):
+    """在本机随机端口启动 _Handler 服务器"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class DownloadParsedTest(_LocalServerTestCase):
+    def _peak_of_download_parsed(self, downloader: Downloader):
+        tracemalloc.start()
+        try:
+            paragraphs = downloader.download_parsed('/chapter.html', reorder.paragraph_parser)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(paragraphs), _PARAGRAPHS)
+        return peak
+
+    def test_streaming_peak_without_cache(self):
+        downloader = Downloader(base_url=self.base_url, interval_jitter=0)
+        try:
+            peak = self._peak_of_download_parsed(downloader)
+        finally:
+            downloader.close()
+        self.assertLess(peak, len(_BODY) // 4)
+
+    @unittest.skipIf(requests_cache is None, '未安装 requests-cache')
+    def test_streaming_bypasses_cache(self):
+        """启用磁盘缓存（目录解析器的配置）时，流式下载也不应缓冲整个响应体"""
+        with tempfile.TemporaryDirectory() as tmp:
+            downloader = Downloader(
+                base_url=self.base_url,
+                interval_jitter=0,
+                cache_name=os.path.join(tmp, 'http_cache'),
+            )
+            try:
+                peak = self._peak_of_download_parsed(downloader)
+                # 流式请求不写缓存，之后的普通请求仍要访问服务器
+                self.assertEqual(len(downloader._cache_backend.responses), 0)
+            finally:
+                downloader.close()
+        self.assertLess(peak, len(_BODY) // 4)
+
+
+class DownloadErrorTest(_LocalServerTestCase):
+    def test_404_is_not_retried(self):
+        downloader = Downloader(base_url=self.base_url, interval_jitter=0, retry_delay=5.0)
+        try:
+            with self.assertRaises(requests.HTTPError) as ctx:
+                downloader.download('/missing.html')
+        finally:
+            downloader.close()
+        self.assertEqual(ctx.exception.response.status_code, 404)
+        self.assertEqual(_Handler.hits['/missing.html'], 1)
+
+    def test_403_is_retried(self):
+        downloader = Downloader(base_url=self.base_url, interval_jitter=0, retry_delay=0.01)
+        try:
+            page_html = downloader.download_bytes('/challenge.html')
+        finally:
+            downloader.close()
+        self.assertEqual(page_html, _BODY)
+        self.assertEqual(_Handler.hits['/challenge.html'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()